@@ -0,0 +1,159 @@
+import queue
+import threading
+import time
+import tkinter as tk
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a background job when it has been cancelled.
+    """
+
+
+class CancelToken:
+    """
+    Flag shared between the GUI and a background job, checked by the job at convenient points.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        """
+        Raise JobCancelled if the job has been cancelled.
+        """
+        if self._event.is_set():
+            raise JobCancelled()
+
+
+class BackgroundJob:
+    """
+    Run a function on a worker thread, so that the Tk main loop keeps handling events while it works.
+
+    The function is called as work(token, progress). It reports its progress by calling
+    progress(fraction, text), which also raises JobCancelled once the job has been cancelled, and may
+    check the token itself. Tk must only be used from the main thread, so the worker never calls back
+    directly: its progress and outcome are put on a queue that the main thread polls with after(), and
+    the callbacks run on the main thread.
+    """
+
+    def __init__(self, widget, work, on_progress=None, on_done=None, on_error=None, on_cancel=None, poll_ms=50):
+        """
+        Initialize the BackgroundJob object.
+
+        Args:
+            widget (tk.Misc): Widget whose after() schedules the polling.
+            work (callable): Function run on the worker thread, called as work(token, progress).
+            on_progress (callable, optional): Called with (fraction, text) for the latest progress report.
+            on_done (callable, optional): Called with the result of work().
+            on_error (callable, optional): Called with the exception raised by work(). If None, the
+                                           exception is raised on the main thread.
+            on_cancel (callable, optional): Called once a cancelled job has stopped.
+            poll_ms (int): Interval between polls of the worker, in ms.
+        """
+        self.widget = widget
+        self.work = work
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.poll_ms = poll_ms
+
+        self.token = CancelToken()
+        self._messages = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self.widget.after(self.poll_ms, self._poll)
+        return self
+
+    def cancel(self):
+        self.token.cancel()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def _run(self):
+        # Worker thread: run the job and post its outcome.
+        try:
+            result = self.work(self.token, self._report)
+        except JobCancelled:
+            self._messages.put(("cancelled", None))
+        except Exception as e:
+            self._messages.put(("error", e))
+        else:
+            self._messages.put(("done", result))
+
+    def _report(self, fraction, text=""):
+        # Worker thread: post a progress report (the main thread only shows the latest one).
+        self.token.check()
+        self._messages.put(("progress", (fraction, text)))
+
+    def _poll(self):
+        """
+        Handle the messages posted by the worker since the last poll, and poll again until it finishes.
+        """
+        progress = None
+        while True:
+            try:
+                kind, value = self._messages.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "progress":
+                progress = value
+                continue
+
+            # The job has finished.
+            if kind == "done" and self.on_done is not None:
+                self.on_done(value)
+            elif kind == "cancelled" and self.on_cancel is not None:
+                self.on_cancel()
+            elif kind == "error":
+                if self.on_error is None:
+                    raise value
+                self.on_error(value)
+            return
+
+        if progress is not None and self.on_progress is not None:
+            self.on_progress(*progress)
+        self.widget.after(self.poll_ms, self._poll)
+
+
+# Example usage
+if __name__ == "__main__":
+    root = tk.Tk()
+    root.title("Background Job")
+
+    status = tk.StringVar(value="Counting...")
+    tk.Label(root, textvariable=status, width=40).pack(padx=20, pady=10)
+
+    def count(token, progress):
+        # Stand-in for heavy geometry work: long enough to see the window stay responsive.
+        total = 0
+        for k in range(50):
+            total += sum(range(200000))
+            progress((k + 1) / 50.0, f"Step {k + 1} of 50")
+        return total
+
+    def done(result):
+        status.set(f"Done: {result}")
+        root.after(1000, root.destroy)
+
+    job = BackgroundJob(root, count, on_progress=lambda fraction, text: status.set(f"{text} ({fraction:.0%})"),
+                        on_done=done, on_cancel=lambda: status.set("Cancelled"))
+    tk.Button(root, text="Cancel", command=job.cancel).pack(pady=(0, 10))
+
+    start = time.perf_counter()
+    job.start()
+    root.mainloop()
+    print(f"Finished in {time.perf_counter() - start:.1f} s")
@@ -0,0 +1,128 @@
+import numpy as np
+import time
+from toolpath import (build_toolpath, CUT_MOVES, MOVE_RETRACT, MOVE_RAPID, MOVE_LINE, MOVE_ARC_CW, MOVE_ARC_CCW,
+                      MOVE_CIRCLE_CW, MOVE_CIRCLE_CCW)
+
+
+def estimate_cycle_time(toolpath, acceleration, rapid_feed=None):
+    """
+    Estimate how long a machine takes to run a toolpath.
+
+    Every move is traversed at its feedrate, limited on arcs by the centripetal acceleration the axes allow.
+    Positioning moves (retract, rapid and plunge) start and end at rest. A run of consecutive cut moves is
+    one continuous motion that accelerates from rest at its start and decelerates to rest at its end; the
+    slowdowns a controller makes at the corners between cut moves are not included.
+
+    Args:
+        toolpath (Toolpath): Toolpath to estimate.
+        acceleration (tuple): Maximum acceleration of the X, Y and Z axes (units/s^2).
+        rapid_feed (float, optional): Traverse rate (units/min) of rapid moves written as G00. If None, rapid
+                                      moves run at their programmed feedrate (G01 at the jog feedrate).
+
+    Returns:
+        dict: Times in seconds ("total", "cut" and "rapid") and path lengths ("cut_length" and "rapid_length").
+              Rapid moves are the retract and XY positioning moves; everything else counts as cutting.
+    """
+    kind = toolpath.kind
+    if len(kind) == 0:
+        return {"total": 0.0, "cut": 0.0, "rapid": 0.0, "cut_length": 0.0, "rapid_length": 0.0}
+    accel_x, accel_y, accel_z = (float(a) for a in acceleration)
+    accel_xy = min(accel_x, accel_y)
+
+    xy, lengths = toolpath.move_lengths()
+    is_rapid = (kind == MOVE_RETRACT) | (kind == MOVE_RAPID)
+    speed = toolpath.feed / 60.0
+    if rapid_feed is not None:
+        speed = np.where(is_rapid, rapid_feed / 60.0, speed)
+
+    # Acceleration along each move: the first axis to reach its limit sets it. Along curved moves the XY
+    # direction turns, so both X and Y may limit it.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dz = np.abs(np.nan_to_num(np.diff(toolpath.z, prepend=np.nan)))
+        straight = np.isin(kind, (MOVE_RETRACT, MOVE_RAPID, MOVE_LINE)) | (lengths == 0)
+        dx = np.abs(np.nan_to_num(np.diff(toolpath.x, prepend=np.nan)))
+        dy = np.abs(np.nan_to_num(np.diff(toolpath.y, prepend=np.nan)))
+        limit = np.where(straight, np.maximum(dx / accel_x, dy / accel_y), xy / accel_xy)
+        accel = lengths / np.maximum(limit, dz / accel_z)
+    accel = np.where(np.isfinite(accel) & (accel > 0), accel, accel_xy)
+
+    # Arcs and circles: centripetal acceleration v^2 / radius stays within the XY acceleration.
+    curved = np.isin(kind, (MOVE_ARC_CW, MOVE_ARC_CCW, MOVE_CIRCLE_CW, MOVE_CIRCLE_CCW))
+    radius = np.hypot(toolpath.i, toolpath.j)
+    speed = np.where(curved, np.minimum(speed, np.sqrt(accel_xy * np.nan_to_num(radius))), speed)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cruise = np.where(lengths > 0, lengths / speed, 0.0)
+
+    # Group the moves into motions that start and end at rest: each positioning move on its own, and
+    # each run of consecutive cut moves.
+    is_cut = np.isin(kind, CUT_MOVES)
+    first = np.flatnonzero(np.concatenate(([True], ~(is_cut[1:] & is_cut[:-1]))))
+    last = np.concatenate((first[1:], [len(kind)])) - 1
+    length = np.add.reduceat(lengths, first)
+    cruise_time = np.add.reduceat(cruise, first)
+
+    # Trapezoidal profile: accelerate to the speed of the first move, decelerate from the speed of the last.
+    # Motions too short to reach their speed follow a triangular profile instead.
+    v_in, a_in, v_out, a_out = speed[first], accel[first], speed[last], accel[last]
+    ramp_length = v_in ** 2 / (2 * a_in) + v_out ** 2 / (2 * a_out)
+    motion_time = np.where(length >= ramp_length, cruise_time + v_in / (2 * a_in) + v_out / (2 * a_out),
+                           2 * np.sqrt(length / np.minimum(a_in, a_out)))
+
+    rapid_time = float(np.sum(motion_time[is_rapid[first]]))
+    cut_time = float(np.sum(motion_time[~is_rapid[first]]))
+    return {"total": rapid_time + cut_time, "cut": cut_time, "rapid": rapid_time,
+            "cut_length": float(np.sum(lengths[~is_rapid])), "rapid_length": float(np.sum(lengths[is_rapid]))}
+
+
+def format_duration(seconds):
+    """
+    Format a duration for display, e.g. "1 h 02 min 05 s" or "3 min 20 s".
+
+    Args:
+        seconds (float): Duration in seconds.
+
+    Returns:
+        str: Formatted duration, rounded to whole seconds.
+    """
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours} h {minutes:02d} min {seconds:02d} s"
+    if minutes:
+        return f"{minutes} min {seconds:02d} s"
+    return f"{seconds} s"
+
+
+# Example usage
+if __name__ == "__main__":
+    example_toolpath = {"safe_z": 6.35, "jog_feed_xyz": 200.0, "cut_feed_xy": 50.0, "cut_feed_z": 25.0,
+                        "depth_per_pass": 0.5, "num_passes": 3, "cut_res": 2000}
+    example_patterns = [{"type": "circle array", "D": [40.0, 70.0], "d": [6.0, 10.0], "n": [12, 18]},
+                        {"type": "roulette", "R": 50.0, "r": 12.0, "s": -1, "d": 20.0}]
+    acceleration = (100.0, 100.0, 50.0)
+
+    toolpath = build_toolpath(example_patterns, example_toolpath)
+    start = time.perf_counter()
+    jog = estimate_cycle_time(toolpath, acceleration)
+    elapsed = time.perf_counter() - start
+    rapid = estimate_cycle_time(toolpath, acceleration, rapid_feed=2500.0)
+
+    # For reference: the whole cut length at the XY feedrate, without acceleration or plunges.
+    cut_time = jog["cut_length"] / (example_toolpath["cut_feed_xy"] / 60.0)
+    print(f"{len(toolpath)} moves, {jog['cut_length']:.0f} mm of cutting ({format_duration(cut_time)} at feed), "
+          f"{jog['rapid_length']:.0f} mm of rapid travel")
+    print(f"G01 rapids at jog feed: {format_duration(jog['total'])} "
+          f"(rapids {format_duration(jog['rapid'])}), estimated in {elapsed * 1000:.1f} ms")
+    print(f"G00 rapids at 2500 mm/min: {format_duration(rapid['total'])} (rapids {format_duration(rapid['rapid'])})")
+
+    # Roulette cut at a constant feed, then with feeds scheduled from the curvature of the curve.
+    roulette_toolpath = dict(example_toolpath, cut_feed_xy=600.0, feed_floor=600.0, feed_ceiling=3000.0,
+                             accel_xy=acceleration[0])
+    for schedule in ("constant", "curvature"):
+        toolpath = build_toolpath(example_patterns[1:], dict(roulette_toolpath, feed_schedule=schedule))
+        cut_feed = toolpath.feed[toolpath.kind == MOVE_LINE]
+        estimate = estimate_cycle_time(toolpath, acceleration, rapid_feed=2500.0)
+        print(f"Roulette at {schedule} feed: {format_duration(estimate['total'])}, "
+              f"F {cut_feed.min():.0f}-{cut_feed.max():.0f} mm/min, "
+              f"{np.count_nonzero(np.diff(cut_feed))} feed changes in {example_toolpath['num_passes']} passes")
@@ -7,17 +7,26 @@ from tkinter import ttk
 from PIL import Image, ImageTk
 from edit_sequence_dialog import EditSequenceDialog
 from export_dialog import ExportDialog
+from background_job import BackgroundJob
+from cycle_time import format_duration
 
 
 class ExportGCodeDialog(ExportDialog):
-    def __init__(self, parent, units, *args, **kwargs):
+    def __init__(self, parent, units, cycle_time_estimator=None, *args, **kwargs):
         """
         Dialog to generate G Code toolpaths.
 
         Args:
             parent (tk.Tk): Parent tkinter application window.
+            units (str): Either 'imperial' or 'metric'.
+            cycle_time_estimator (callable, optional): Function taking the toolpath parameters and a CancelToken,
+                                                       and returning the estimated cycle time in seconds. Raises
+                                                       ValueError if the parameters are invalid. If given, the
+                                                       estimate can be shown. It is run on a worker thread.
         """
         self.selected_units = units
+        self.cycle_time_estimator = cycle_time_estimator
+        self.estimate_job = None  # background job of the running cycle time estimate
         super().__init__(parent, *args, **kwargs)
 
     def initialize_dialog_settings(self):
@@ -36,10 +45,27 @@ class ExportGCodeDialog(ExportDialog):
                              "cut_feed_z": "1.0",
                              "depth_per_pass": "0.02",
                              "num_passes": 1,
-                             "cut_res": 200
+                             "cut_res": 200,
+                             "sampling": "uniform",
+                             "chord_tol": "0.0005",
+                             "roulette_moves": "linear",
+                             "fit_tol": "0.0005",
+                             "compact_output": False,
+                             "strip_comments": False,
+                             "distance_mode": "absolute",
+                             "pass_strategy": "layered",
+                             "optimize_travel": False,
+                             "rapid_moves": False,
+                             "rapid_feed": "100",
+                             "accel_xy": "4.0",
+                             "accel_z": "2.0",
+                             "feed_schedule": "constant",
+                             "feed_floor": "2.0",
+                             "feed_ceiling": "8.0"
                              }
             self.unit_labels = {"length": "in",
-                                "speed": "in/min"
+                                "speed": "in/min",
+                                "acceleration": "in/s²"
                                 }
         else:
             self.defaults = {"safe_z": "6.35",
@@ -48,10 +74,27 @@ class ExportGCodeDialog(ExportDialog):
                              "cut_feed_z": "25",
                              "depth_per_pass": "0.5",
                              "num_passes": 1,
-                             "cut_res": 200
+                             "cut_res": 200,
+                             "sampling": "uniform",
+                             "chord_tol": "0.01",
+                             "roulette_moves": "linear",
+                             "fit_tol": "0.01",
+                             "compact_output": False,
+                             "strip_comments": False,
+                             "distance_mode": "absolute",
+                             "pass_strategy": "layered",
+                             "optimize_travel": False,
+                             "rapid_moves": False,
+                             "rapid_feed": "2500",
+                             "accel_xy": "100",
+                             "accel_z": "50",
+                             "feed_schedule": "constant",
+                             "feed_floor": "50",
+                             "feed_ceiling": "200"
                              }
             self.unit_labels = {"length": "mm",
-                                "speed": "mm/min"
+                                "speed": "mm/min",
+                                "acceleration": "mm/s²"
                                 }
 
         # Set starting sequences to default
@@ -185,9 +228,225 @@ class ExportGCodeDialog(ExportDialog):
             right_label_text="divs/360°",
         )
 
+        self.create_input_row(
+            self.content_frame,
+            row=8,
+            key="sampling",
+            left_label_text="Roulette sampling",
+            widget_type="radiobutton",
+            widget_options={
+                "default": self.defaults['sampling'],
+                "options": [("uniform", "Uniform", None), ("adaptive", "Adaptive", None)],  # (value, label, command)
+            },
+            right_label_text="",
+        )
+
+        self.create_input_row(
+            self.content_frame,
+            row=9,
+            key="chord_tol",
+            left_label_text="Chord tolerance",
+            widget_type="entry",
+            widget_options={
+                "default": self.defaults['chord_tol'],
+                "width": 16,
+                "validate": "key",
+                "validatecommand": (validate_float_pos_cmd, "%P"),
+            },
+            right_label_text=f"[{self.unit_labels['length']}]",
+        )
+
+        self.create_input_row(
+            self.content_frame,
+            row=10,
+            key="roulette_moves",
+            left_label_text="Roulette moves",
+            widget_type="radiobutton",
+            widget_options={
+                "default": self.defaults['roulette_moves'],
+                "options": [("linear", "Lines", None), ("arc", "Arcs", None), ("spline", "G5 Splines", None)],  # (value, label, command)
+            },
+            right_label_text="",
+        )
+
+        self.create_input_row(
+            self.content_frame,
+            row=11,
+            key="fit_tol",
+            left_label_text="Fit tolerance",
+            widget_type="entry",
+            widget_options={
+                "default": self.defaults['fit_tol'],
+                "width": 16,
+                "validate": "key",
+                "validatecommand": (validate_float_pos_cmd, "%P"),
+            },
+            right_label_text=f"[{self.unit_labels['length']}]",
+        )
+
+        self.create_input_row(
+            self.content_frame,
+            row=12,
+            key="compact_output",
+            left_label_text="Compact output",
+            widget_type="checkbutton",
+            widget_options={"default": self.defaults['compact_output']},
+        )
+
+        self.create_input_row(
+            self.content_frame,
+            row=13,
+            key="strip_comments",
+            left_label_text="Strip comments",
+            widget_type="checkbutton",
+            widget_options={"default": self.defaults['strip_comments']},
+        )
+
+        self.create_input_row(
+            self.content_frame,
+            row=14,
+            key="distance_mode",
+            left_label_text="Cut distance mode",
+            widget_type="radiobutton",
+            widget_options={
+                "default": self.defaults['distance_mode'],
+                "options": [("absolute", "Absolute (G90)", None), ("incremental", "Incremental (G91)", None)],  # (value, label, command)
+            },
+            right_label_text="",
+        )
+
+        self.create_input_row(
+            self.content_frame,
+            row=15,
+            key="pass_strategy",
+            left_label_text="Pass strategy",
+            widget_type="radiobutton",
+            widget_options={
+                "default": self.defaults['pass_strategy'],
+                "options": [("layered", "Layered", None), ("helical", "Helical ramp", None)],  # (value, label, command)
+            },
+            right_label_text="",
+        )
+
+        self.create_input_row(
+            self.content_frame,
+            row=16,
+            key="optimize_travel",
+            left_label_text="Optimize travel order",
+            widget_type="checkbutton",
+            widget_options={"default": self.defaults['optimize_travel']},
+        )
+
+        self.create_input_row(
+            self.content_frame,
+            row=17,
+            key="rapid_moves",
+            left_label_text="Rapid moves (G00)",
+            widget_type="checkbutton",
+            widget_options={"default": self.defaults['rapid_moves']},
+        )
+
+        self.create_input_row(
+            self.content_frame,
+            row=18,
+            key="rapid_feed",
+            left_label_text="Machine Rapid Rate",
+            widget_type="entry",
+            widget_options={
+                "default": self.defaults['rapid_feed'],
+                "width": 16,
+                "validate": "key",
+                "validatecommand": (validate_float_pos_cmd, "%P"),
+            },
+            right_label_text=f"[{self.unit_labels['speed']}]",
+        )
+
+        self.create_input_row(
+            self.content_frame,
+            row=19,
+            key="accel_xy",
+            left_label_text="Acceleration XY",
+            widget_type="entry",
+            widget_options={
+                "default": self.defaults['accel_xy'],
+                "width": 16,
+                "validate": "key",
+                "validatecommand": (validate_float_pos_cmd, "%P"),
+            },
+            right_label_text=f"[{self.unit_labels['acceleration']}]",
+        )
+
+        self.create_input_row(
+            self.content_frame,
+            row=20,
+            key="accel_z",
+            left_label_text="Acceleration Z",
+            widget_type="entry",
+            widget_options={
+                "default": self.defaults['accel_z'],
+                "width": 16,
+                "validate": "key",
+                "validatecommand": (validate_float_pos_cmd, "%P"),
+            },
+            right_label_text=f"[{self.unit_labels['acceleration']}]",
+        )
+
+        self.create_input_row(
+            self.content_frame,
+            row=21,
+            key="feed_schedule",
+            left_label_text="Roulette feed",
+            widget_type="radiobutton",
+            widget_options={
+                "default": self.defaults['feed_schedule'],
+                "options": [("constant", "Constant", None), ("curvature", "Curvature", None)],  # (value, label, command)
+            },
+            right_label_text="",
+        )
+
+        self.create_input_row(
+            self.content_frame,
+            row=22,
+            key="feed_floor",
+            left_label_text="Feed floor",
+            widget_type="entry",
+            widget_options={
+                "default": self.defaults['feed_floor'],
+                "width": 16,
+                "validate": "key",
+                "validatecommand": (validate_float_pos_cmd, "%P"),
+            },
+            right_label_text=f"[{self.unit_labels['speed']}]",
+        )
+
+        self.create_input_row(
+            self.content_frame,
+            row=23,
+            key="feed_ceiling",
+            left_label_text="Feed ceiling",
+            widget_type="entry",
+            widget_options={
+                "default": self.defaults['feed_ceiling'],
+                "width": 16,
+                "validate": "key",
+                "validatecommand": (validate_float_pos_cmd, "%P"),
+            },
+            right_label_text=f"[{self.unit_labels['speed']}]",
+        )
+
+        # Add the cycle time estimate (if an estimator is available)
+        if self.cycle_time_estimator is not None:
+            self.cycle_time_label = tk.Label(self.content_frame, text="Cycle Time", width=16, anchor="w")
+            self.cycle_time_var = tk.StringVar(value="")
+            self.cycle_time_value = tk.Label(self.content_frame, textvariable=self.cycle_time_var, anchor="w")
+            self.cycle_time_button = tk.Button(self.content_frame, text="Estimate", command=self.estimate_cycle_time)
+            self.cycle_time_label.grid(row=24, column=0, padx=(15, 5), pady=5, sticky="w")
+            self.cycle_time_value.grid(row=24, column=1, columnspan=2, padx=5, pady=5, sticky="ew")
+            self.cycle_time_button.grid(row=24, column=3, padx=5, pady=5, sticky="w")
+
         # Add an empty row for padding
         spacer = tk.Frame(self.content_frame)
-        spacer.grid(row=8, column=0, columnspan=4, pady=3)  # add extra vertical padding
+        spacer.grid(row=25, column=0, columnspan=4, pady=3)  # add extra vertical padding
 
         # Add widgets for editing sequences
         self.sequences_lf = ttk.LabelFrame(self.main_frame, text="Sequences")
@@ -252,6 +511,42 @@ class ExportGCodeDialog(ExportDialog):
                                     initial_content=self.sequences[item])
         self.sequences[item] = dialog.get_settings()
 
+    def estimate_cycle_time(self):
+        """
+        Estimate the cycle time of the program for the current toolpath parameters on a worker thread, so that
+        the dialog stays responsive, and show it in the dialog when it is ready.
+        """
+        toolpath_parameters = self.get_widget_values()
+        self.cycle_time_var.set("Estimating...")
+        self.cycle_time_button.config(state="disabled")
+
+        # The job is polled by the parent window, which outlives the dialog.
+        self.estimate_job = BackgroundJob(self.parent,
+                                          lambda token, progress: self.cycle_time_estimator(toolpath_parameters, token),
+                                          on_done=self.show_cycle_time, on_error=self.show_cycle_time)
+        self.estimate_job.start()
+
+    def show_cycle_time(self, result):
+        """
+        Show the outcome of a cycle time estimate: the time in seconds, or the exception raised by the estimator.
+        """
+        if not self.winfo_exists():
+            return  # dialog closed while estimating
+        self.estimate_job = None
+        self.cycle_time_button.config(state="normal")
+        if isinstance(result, ValueError):
+            self.cycle_time_var.set("Not available (check parameters)")
+        elif isinstance(result, Exception):
+            self.cycle_time_var.set(f"Failed ({type(result).__name__}): {result}")
+        else:
+            self.cycle_time_var.set(format_duration(result))
+
+    def close(self, event=None):
+        """Stop a running cycle time estimate and close."""
+        if self.estimate_job is not None:
+            self.estimate_job.cancel()
+        super().close(event)
+
     def export(self, event=None):
         toolpath_parameters = self.get_widget_values()
 
@@ -29,7 +29,9 @@ class ExportSVGDialog(ExportDialog):
                          "stroke_color": "slategray",
                          "stroke_width": 0.25,
                          "include_params": True,
-                         "path_resolution": 1000}
+                         "path_resolution": 1000,
+                         "fit_curves": False,
+                         "fit_tolerance": 0.01}
 
     def add_content(self):
         """
@@ -135,6 +137,30 @@ class ExportSVGDialog(ExportDialog):
             widget_options={"default": True},
         )
 
+        self.create_input_row(
+            self.content_frame,
+            row=7,
+            key="fit_curves",
+            left_label_text="Fit Curves",
+            widget_type="checkbutton",
+            widget_options={"default": self.defaults['fit_curves']},
+        )
+
+        self.create_input_row(
+            self.content_frame,
+            row=8,
+            key="fit_tolerance",
+            left_label_text="Fit Tolerance",
+            widget_type="entry",
+            widget_options={
+                "default": self.defaults['fit_tolerance'],
+                "width": 16,
+                "validate": "key",
+                "validatecommand": (validate_float_pos_cmd, "%P"),
+            },
+            right_label_text="[dwg units]",
+        )
+
 
 class DemoApp(tk.Tk):
     def __init__(self):
@@ -1,12 +1,218 @@
 import numpy as np
 import math
-from fractions import Fraction
+import os
+import time
+from toolpath import (Toolpath, build_toolpath, MOVE_RETRACT, MOVE_RAPID, MOVE_PLUNGE, MOVE_LINE, MOVE_ARC_CW,
+                      MOVE_ARC_CCW, MOVE_CIRCLE_CW, MOVE_CIRCLE_CCW, MOVE_CUBIC)
+
+
+# Write buffer for streamed G code files.
+STREAM_BUFFER_SIZE = 1 << 16
+
+# Cut moves written in incremental distance mode (if specified). Full circles have no axis words.
+INCREMENTAL_MOVES = (MOVE_LINE, MOVE_ARC_CW, MOVE_ARC_CCW, MOVE_CUBIC)
+
+# Largest difference (in mm) between the distances from an arc center to the arc start and end points
+# that controllers accept. GRBL is the strictest (error 33 above 0.005 mm); LinuxCNC allows 0.002 in.
+ARC_RADIUS_TOLERANCE = 0.005
+
+# Decimal places of arc center offsets (I, J). Inch output writes a fourth place so that rounding the
+# center keeps the two radii of an arc well within ARC_RADIUS_TOLERANCE.
+ARC_OFFSET_PLACES = {"metric": 3, "imperial": 4}
+
+
+def _quantize(value):
+    """
+    Return a value in integer thousandths, rounded exactly as f"{value:.3f}" rounds it.
+    """
+    scaled = value * 1000.0
+    if abs(abs(scaled - math.floor(scaled)) - 0.5) <= 4 * math.ulp(scaled):
+        # Within rounding error of a half-thousandth; let the formatting decide.
+        return round(float(f"{value:.3f}") * 1000)
+    return round(scaled)
+
+
+def _format_quantized(thousandths):
+    """
+    Format integer thousandths as a decimal with three places, without a sign on zero.
+    """
+    sign = "-" if thousandths < 0 else ""
+    return f"{sign}{abs(thousandths) // 1000}.{abs(thousandths) % 1000:03d}"
+
+
+def _quantize3(values):
+    """
+    Scale an array of numbers to integer thousandths, rounded exactly as f"{value:.3f}" rounds them.
+
+    The few values that lie within rounding error of a half-thousandth are rounded by Python's own
+    formatting; all others by np.rint().
+
+    Args:
+        values (np.ndarray): Finite values.
+
+    Returns:
+        np.ndarray: int64 thousandths.
+    """
+    values = np.asarray(values, dtype=float)
+    scaled = values * 1000.0
+    thousandths = np.rint(scaled)
+
+    # Resolve values whose rounding direction is within the error of the scaling.
+    ambiguous = np.abs(np.abs(scaled - np.floor(scaled)) - 0.5) <= 4 * np.spacing(np.abs(scaled))
+    for k in np.flatnonzero(ambiguous).tolist():
+        thousandths[k] = round(float(f"{values[k]:.3f}") * 1000)
+
+    return thousandths.astype(np.int64)
+
+
+def _format_places(value, places):
+    """
+    Format a value with a fixed number of decimal places, without a sign on zero.
+    """
+    text = f"{value:.{places}f}"
+    return text[1:] if text.startswith("-") and not text.strip("-0.") else text
+
+
+def _format_fixed3(values, thousandths=None, negative=None):
+    """
+    Format an array of numbers like f"{value:.3f}", all at once.
+
+    Values are scaled to integer thousandths and their digits written into a byte matrix, one row
+    per value. Unused leading positions are NUL bytes, to be removed after the rows are joined.
+    The result is identical to formatting each value separately.
+
+    Args:
+        values (np.ndarray): Finite values to format.
+        thousandths (np.ndarray, optional): Values already scaled by _quantize3().
+        negative (np.ndarray, optional): Where to print a minus sign. Defaults to the sign bit of each
+                                         value, as f-string formatting does (e.g. "-0.000").
+
+    Returns:
+        np.ndarray: uint8 array of shape (len(values), width).
+    """
+    values = np.asarray(values, dtype=float)
+    if thousandths is None:
+        thousandths = _quantize3(values)
+    if negative is None:
+        negative = np.signbit(values)
+
+    magnitude = np.abs(thousandths)
+    whole = magnitude // 1000
+    fraction = magnitude % 1000
+    n_digits = len(str(int(whole.max()))) if len(values) else 1
+
+    rows = np.zeros((len(values), n_digits + 5), dtype=np.uint8)
+
+    # Sign
+    rows[:, 0] = np.where(negative, ord("-"), 0)
+
+    # Whole part without leading zeros, then the decimal point and three decimals.
+    for c in range(n_digits):
+        place = 10 ** (n_digits - 1 - c)
+        digit = ord("0") + (whole // place) % 10
+        rows[:, 1 + c] = digit if c == n_digits - 1 else np.where(whole < place, 0, digit)
+    rows[:, n_digits + 1] = ord(".")
+    rows[:, n_digits + 2] = ord("0") + fraction // 100
+    rows[:, n_digits + 3] = ord("0") + (fraction // 10) % 10
+    rows[:, n_digits + 4] = ord("0") + fraction % 10
+
+    return rows
 
 
 class GCodePostProcessor:
-    def __init__(self, units):
+    def __init__(self, units, stream=None, compact=False, strip_comments=False, incremental=False, rapids=False):
+        """
+        Converter to translate circle and roulette toolpaths into G code.
+
+        Args:
+            units (str): Either 'imperial' or 'metric'.
+            stream (file, optional): Writable text file. If given, each line is written to it as soon as
+                                     it is generated instead of being kept in memory.
+            compact (bool): If True, track the modal state of the controller and leave out repeated
+                            motion modes, repeated feedrates, unchanged axis words and indentation,
+                            and drop linear moves that have zero length at the output resolution.
+            strip_comments (bool): If True, leave out comments and blank lines.
+            incremental (bool): If True, write the cut moves of each pass in incremental distance mode (G91).
+                                Positioning moves stay absolute (G90).
+            rapids (bool): If True, write the retract and XY positioning moves of toolpaths as rapid moves (G00)
+                           at the machine traverse rate, instead of linear moves at the jog feedrate.
+        """
         self.units = units
-        self.gcode = []  # stores generated G code lines
+        self.gcode = []  # stores generated G code lines (when not streaming)
+        self.stream = stream
+        self.filename = None  # file opened by open_file()
+        self._line_count = 0
+        self.travel = None  # rapid travel before/after travel-order optimization, if the toolpath was optimized
+
+        self.compact = compact
+        self.strip_comments = strip_comments
+        self.incremental = incremental
+        self.rapids = rapids
+        self._relative = False  # True while G91 is active
+        self._reset_modal_state()
+        self.arc_places = ARC_OFFSET_PLACES[units]
+
+    def _reset_modal_state(self):
+        """
+        Forget the modal state (e.g. after a user-defined sequence that may change it).
+        Positions and the feedrate are tracked in integer thousandths, as written, so that increments
+        are exact differences and rounding error cannot accumulate over a run of G91 moves.
+        """
+        self._modal = {"G": None, "X": None, "Y": None, "Z": None, "F": None}
+
+    def set_distance_mode(self, incremental, indent_amount=0):
+        """
+        Switch between absolute (G90) and incremental (G91) distance mode.
+
+        Args:
+            incremental (bool): True for G91, False for G90.
+        """
+        if incremental and None in (self._modal["X"], self._modal["Y"], self._modal["Z"]):
+            raise ValueError("Incremental moves need a known start position.")
+
+        self._relative = incremental
+        indent = "" if self.compact else indent_amount * "\t"
+        self._emit(indent + ("G91" if incremental else "G90"))
+
+    def _axis_values(self, axes):
+        """
+        Record the target of a move in the tracked position and return the values to write for it.
+
+        Args:
+            axes (list): (letter, value) pairs; values that are None are left out.
+
+        Returns:
+            list: The values to write: the targets themselves in G90, or the increments from the
+                  previous position in G91.
+        """
+        if not self.incremental:
+            return [value for _, value in axes]  # positions are only needed for G91
+
+        values = []
+        for letter, value in axes:
+            if value is not None:
+                thousandths = _quantize(value)
+                if self._relative:
+                    value = (thousandths - self._modal[letter]) / 1000.0
+                self._modal[letter] = thousandths
+            values.append(value)
+        return values
+
+    def _emit(self, line):
+        """
+        Add one line to the G code, either in memory or on the output stream.
+
+        Args:
+            line (str): Line of G code without a trailing newline.
+        """
+        if self.stream is None:
+            self.gcode.append(line)
+        else:
+            # Lines are separated (not terminated) by newlines, matching get_gcode().
+            if self._line_count:
+                self.stream.write("\n")
+            self.stream.write(line)
+        self._line_count += 1
 
     def add_comment(self, comment, apply_formatting=True, indent_amount=0):
         """
@@ -16,15 +222,20 @@ class GCodePostProcessor:
             comment (str): String containing the comment to add to the G code compilation.
         """
         if apply_formatting:
-            self.gcode.append(indent_amount * "\t" + f"({comment})")
+            if not self.strip_comments:
+                self._emit(indent_amount * "\t" + f"({comment})")
         else:
-            self.gcode.append(f"{comment}")
+            self._emit(f"{comment}")
+
+            # Unformatted text (e.g. a start sequence) may change the modal state.
+            self._reset_modal_state()
 
     def add_linebreak(self):
         """
         Add a blank line to the G code. (Useful for creating breaks between code sections.)
         """
-        self.gcode.append("")  # already includes newline
+        if not self.strip_comments:
+            self._emit("")  # already includes newline
 
     def move_linear(self, x=None, y=None, z=None, feedrate=None, comment=None, indent_amount=0):
         """
@@ -36,6 +247,12 @@ class GCodePostProcessor:
             comment (str, optional): In-line description for the move (to be added after the command).
         """
 
+        if self.compact:
+            self._move_compact("G01", [("X", x), ("Y", y), ("Z", z)], [], feedrate, comment, droppable=True)
+            return
+
+        x, y, z = self._axis_values([("X", x), ("Y", y), ("Z", z)])
+
         # Initialize command string. Add extra components if specified.
         command = indent_amount * "\t" + "G01"
         if x is not None:
@@ -46,13 +263,223 @@ class GCodePostProcessor:
             command += f" Z{z:.3f}"
         if feedrate is not None:
             command += f" F{feedrate:.3f}"
-        if comment is not None:
+        if comment is not None and not self.strip_comments:
             command += f" ({comment})"
 
-        # Append the generated command to the G code list
-        self.gcode.append(command)
+        # Append the generated command to the G code
+        self._emit(command)
 
-    def move_arc(self, x=None, y=None, i=None, j=None, clockwise=True, feedrate=None, comment=None, indent_amount=0):
+    def move_rapid(self, x=None, y=None, z=None, comment=None, indent_amount=0):
+        """
+        Add a rapid move (G00 command) to the G code. The machine moves at its traverse rate; the
+        feedrate of later moves is not affected.
+
+        Args:
+            x, y, z (float, optional): Target coordinates (ending position) for the move.
+            comment (str, optional): In-line description for the move (to be added after the command).
+        """
+        if self.compact:
+            self._move_compact("G00", [("X", x), ("Y", y), ("Z", z)], [], None, comment, droppable=True)
+            return
+
+        x, y, z = self._axis_values([("X", x), ("Y", y), ("Z", z)])
+
+        # Initialize command string. Add extra components if specified.
+        command = indent_amount * "\t" + "G00"
+        if x is not None:
+            command += f" X{x:.3f}"
+        if y is not None:
+            command += f" Y{y:.3f}"
+        if z is not None:
+            command += f" Z{z:.3f}"
+        if comment is not None and not self.strip_comments:
+            command += f" ({comment})"
+
+        # Append the generated command to the G code
+        self._emit(command)
+
+    def move_linear_batch(self, x, y, z=None, feedrate=None, indent_amount=0):
+        """
+        Add a run of linear moves (G01 commands) to the G code, formatting all coordinates in one
+        vectorized pass. The output is identical to calling move_linear() for each move.
+
+        Args:
+            x, y (np.ndarray): Target coordinates (ending positions) of the moves.
+            z (np.ndarray, optional): Target Z coordinates of the moves.
+            feedrate (float or np.ndarray, optional): Feedrate for all moves, or one per move.
+        """
+        self._emit_block(*self._linear_batch_block(x, y, z, feedrate, indent_amount))
+
+    def _linear_batch_block(self, x, y, z=None, feedrate=None, indent_amount=0):
+        """
+        Format a run of linear moves for move_linear_batch(), updating the modal state as if they were written.
+
+        Returns:
+            tuple: The block of lines (separated, not terminated, by newlines) and the number of lines in it.
+        """
+        n = len(x)
+        if n == 0:
+            return "", 0
+        if self.compact:
+            return self._linear_batch_block_compact(x, y, z, feedrate)
+
+        # Collect each row as [indent + "G01"][" X"][x][" Y"][y]...; constant parts are broadcast.
+        def constant(text):
+            return np.broadcast_to(np.frombuffer(text.encode(), dtype=np.uint8), (n, len(text)))
+
+        parts = [constant(indent_amount * "\t" + "G01")]
+        for letter, values in (("X", x), ("Y", y), ("Z", z)):
+            if values is not None:
+                parts += [constant(f" {letter}"), self._axis_rows(letter, values)]
+        if feedrate is not None:
+            if np.ndim(feedrate) == 0:
+                parts.append(constant(f" F{feedrate:.3f}"))
+            else:
+                parts += [constant(" F"), _format_fixed3(feedrate)]
+        parts.append(constant("\n"))
+
+        # Join the rows and drop the padding.
+        block = np.concatenate(parts, axis=1).tobytes().replace(b"\x00", b"").decode()
+        return block[:-1], n
+
+    def _emit_block(self, block, count):
+        """
+        Add a block of lines to the G code at once.
+
+        Args:
+            block (str): The lines, separated (not terminated) by newlines.
+            count (int): The number of lines in the block.
+        """
+        if count == 0:
+            return
+        self._emit(block)
+        self._line_count += count - 1
+
+    def _axis_rows(self, letter, values):
+        """
+        Format a run of targets for one axis like _axis_values(), all at once.
+
+        Args:
+            letter (str): Axis letter.
+            values (np.ndarray): Targets of the moves.
+
+        Returns:
+            np.ndarray: Formatted rows from _format_fixed3().
+        """
+        thousandths = _quantize3(values)
+        if self._relative:
+            steps = np.diff(thousandths, prepend=self._modal[letter])
+            rows = _format_fixed3(values, thousandths=steps, negative=steps < 0)
+        else:
+            rows = _format_fixed3(values, thousandths=thousandths)
+        self._modal[letter] = int(thousandths[-1])
+        return rows
+
+    def _move_compact(self, motion, axis_words, offset_words, feedrate, comment, droppable=False, offset_places=3):
+        """
+        Add a move to the G code, leaving out the words that the modal state makes redundant.
+
+        Args:
+            motion (str): Motion mode ("G00", "G01", "G02", "G03" or "G05").
+            axis_words (list): Modal (letter, value) pairs; values that are None are left out.
+            offset_words (list): Non-modal (letter, value) pairs, always written unless None.
+            feedrate (float): Feedrate for the move, or None.
+            comment (str): In-line description for the move, or None.
+            droppable (bool): If True, drop the move when no axis changes at the output resolution.
+            offset_places (int): Decimal places of the offset words.
+        """
+        words = []
+        moved = {}
+        for letter, value in axis_words:
+            if value is not None:
+                thousandths = _quantize(value)
+                if thousandths != self._modal[letter]:
+                    written = thousandths - self._modal[letter] if self._relative else thousandths
+                    words.append(f"{letter}{_format_quantized(written)}")
+                    moved[letter] = thousandths
+
+        if droppable and not moved:
+            return  # zero-length move; any new feedrate is written with the next move
+
+        for letter, value in offset_words:
+            if value is not None:
+                words.append(f"{letter}{_format_places(value, offset_places)}")
+
+        if feedrate is not None:
+            thousandths = _quantize(feedrate)
+            if thousandths != self._modal["F"]:
+                words.append(f"F{_format_quantized(thousandths)}")
+                self._modal["F"] = thousandths
+
+        if motion != self._modal["G"]:
+            words.insert(0, motion)
+            self._modal["G"] = motion
+        self._modal.update(moved)
+
+        if comment is not None and not self.strip_comments:
+            words.append(f"({comment})")
+
+        self._emit(" ".join(words))
+
+    def _linear_batch_block_compact(self, x, y, z, feedrate):
+        """
+        Format a run of linear moves like _move_compact(), for whole coordinate arrays at once.
+        """
+        axes = [("X", x), ("Y", y)] + ([("Z", z)] if z is not None else [])
+        quantized = {letter: _quantize3(values) for letter, values in axes}
+
+        # Drop moves that do not change any axis. A dropped move repeats the position before it, so each
+        # kept move can still be compared with the move just before it.
+        sentinel = np.iinfo(np.int64).min
+        changed = {}
+        keep = np.zeros(len(x), dtype=bool)
+        for letter, values in quantized.items():
+            previous = np.concatenate(([sentinel if self._modal[letter] is None else self._modal[letter]], values[:-1]))
+            changed[letter] = values != previous
+            keep |= changed[letter]
+
+        n = int(np.count_nonzero(keep))
+        if n == 0:
+            return "", 0
+
+        def constant(text, mask=None):
+            column = np.broadcast_to(np.frombuffer(text.encode(), dtype=np.uint8), (n, len(text)))
+            return column if mask is None else np.where(mask[:, None], column, 0).astype(np.uint8)
+
+        def word(letter, values, mask):
+            rows = _format_fixed3(values, thousandths=values, negative=values < 0)
+            return [constant(f" {letter}", mask), np.where(mask[:, None], rows, 0).astype(np.uint8)]
+
+        # Motion mode on the first move only (if it changes).
+        first = np.zeros(n, dtype=bool)
+        first[0] = True
+        parts = [constant("G01", first & (self._modal["G"] != "G01"))]
+
+        for letter, values in quantized.items():
+            if self._relative:
+                # Dropped moves repeat the previous position, so steps between kept moves are unaffected.
+                written = np.diff(values, prepend=self._modal[letter])[keep]
+            else:
+                written = values[keep]
+            parts += word(letter, written, changed[letter][keep])
+            self._modal[letter] = int(values[keep][-1])
+
+        # Feedrate wherever it differs from the last one written.
+        if feedrate is not None:
+            feeds = np.broadcast_to(_quantize3(np.atleast_1d(feedrate)), (len(x),))[keep]
+            previous = np.concatenate(([sentinel if self._modal["F"] is None else self._modal["F"]], feeds[:-1]))
+            parts += word("F", feeds, feeds != previous)
+            self._modal["F"] = int(feeds[-1])
+        self._modal["G"] = "G01"
+        parts.append(constant("\n"))
+
+        # Join the rows, drop the padding and the space left before the first word of each row.
+        block = np.concatenate(parts, axis=1).tobytes().replace(b"\x00", b"").replace(b"\n ", b"\n").decode()
+        block = block[1:] if block.startswith(" ") else block
+        return block[:-1], n
+
+    def move_arc(self, x=None, y=None, z=None, i=None, j=None, clockwise=True, feedrate=None, comment=None,
+                 indent_amount=0):
         """
         Add an arc move (G02/G03 command) to the G code. Arc starts at the current position.
 
@@ -60,9 +487,11 @@ class GCodePostProcessor:
             - For an arc less than 360 degrees: One or more axis words (X, Y) and one or more offsets (I, J) must be
               provided.
             - For a full circle: No axis words (X, Y) and one or more offsets (I, J) must be provided.
+            - A Z target turns the arc (or full circle) into a helix.
 
         Args:
             x, y (float, optional): Target coordinates (ending position) for the move.
+            z (float, optional): Target Z coordinate for a helical move.
             i, j (float, optional): X and Y offsets from the arc start point (current position) to the arc center point.
             clockwise (bool): Direction for the move. True for clockwise (G02), False for counterclockwise (G03).
             feedrate (float, optional): Feedrate for the move.
@@ -75,6 +504,13 @@ class GCodePostProcessor:
         if (x is not None or y is not None) and (i is None and j is None):
             raise ValueError("For an arc less than 360 degrees, at least one of I or J must be specified.")
 
+        if self.compact:
+            self._move_compact("G02" if clockwise else "G03", [("X", x), ("Y", y), ("Z", z)], [("I", i), ("J", j)],
+                               feedrate, comment, offset_places=self.arc_places)
+            return
+
+        x, y, z = self._axis_values([("X", x), ("Y", y), ("Z", z)])
+
         # Determine G code command (G02 for clockwise, G03 for counterclockwise)
         command = indent_amount * "\t" + "G02" if clockwise else indent_amount * "\t" + "G03"
 
@@ -83,17 +519,84 @@ class GCodePostProcessor:
             command += f" X{x:.3f}"
         if y is not None:
             command += f" Y{y:.3f}"
+        if z is not None:
+            command += f" Z{z:.3f}"
         if i is not None:
-            command += f" I{i:.3f}"
+            command += f" I{i:.{self.arc_places}f}"
         if j is not None:
-            command += f" J{j:.3f}"
+            command += f" J{j:.{self.arc_places}f}"
+        if feedrate is not None:
+            command += f" F{feedrate:.3f}"
+        if comment is not None and not self.strip_comments:
+            command += f" ({comment})"
+
+        # Append the generated command to the G code
+        self._emit(command)
+
+    def _arc_offsets(self, start_x, start_y, x, y, i, j):
+        """
+        Compute the center offsets to write for an arc, given the arc start and end points before rounding.
+
+        The end points are written rounded to 0.001, and rounding the center offsets on their own as well
+        leaves the center at different distances from the two written points, which controllers reject.
+        The fitted center is instead moved onto the perpendicular bisector of the rounded end points, so
+        that only rounding the offsets to arc_places separates the two radii.
+
+        Args:
+            start_x, start_y (float): Start point of the arc (the end of the previous move).
+            x, y (float): End point of the arc.
+            i, j (float): Offsets from the start point to the fitted center.
+
+        Returns:
+            tuple: (i, j) rounded to arc_places, or None if the rounded end points coincide (the arc has no
+                   length at the output resolution, and G02/G03 would cut a full circle).
+        """
+        sx, sy = _quantize(start_x) / 1000.0, _quantize(start_y) / 1000.0
+        ex, ey = _quantize(x) / 1000.0, _quantize(y) / 1000.0
+        chord_x, chord_y = ex - sx, ey - sy
+        chord_sq = chord_x ** 2 + chord_y ** 2
+        if chord_sq == 0:
+            return None
+
+        # Project the fitted center onto the bisector, along the normal to the chord.
+        mid_x, mid_y = (sx + ex) / 2.0, (sy + ey) / 2.0
+        t = ((start_x + i - mid_x) * -chord_y + (start_y + j - mid_y) * chord_x) / chord_sq
+        i = round(mid_x - t * chord_y - sx, self.arc_places)
+        j = round(mid_y + t * chord_x - sy, self.arc_places)
+
+        # Both radii as a controller computes them from the written words.
+        mismatch = abs(math.hypot(i, j) - math.hypot(sx + i - ex, sy + j - ey))
+        if mismatch * (1.0 if self.units == "metric" else 25.4) > ARC_RADIUS_TOLERANCE:
+            raise ValueError(f"Arc radii differ by {mismatch:.5f} at X{ex:.3f} Y{ey:.3f}.")
+        return i, j
+
+    def move_cubic(self, x, y, i, j, p, q, feedrate=None, comment=None, indent_amount=0):
+        """
+        Add a cubic spline move (G5 command) to the G code. Spline starts at the current position.
+        Supported by LinuxCNC in the XY plane (G17).
+
+        Args:
+            x, y (float): Target coordinates (ending position) for the move.
+            i, j (float): X and Y offsets from the start point to the first control point.
+            p, q (float): X and Y offsets from the end point to the second control point.
+            feedrate (float, optional): Feedrate for the move.
+            comment (str, optional): In-line description for the move (to be added after the command).
+        """
+        if self.compact:
+            self._move_compact("G05", [("X", x), ("Y", y)], [("I", i), ("J", j), ("P", p), ("Q", q)],
+                               feedrate, comment)
+            return
+
+        x, y = self._axis_values([("X", x), ("Y", y)])
+
+        command = indent_amount * "\t" + f"G05 I{i:.3f} J{j:.3f} P{p:.3f} Q{q:.3f} X{x:.3f} Y{y:.3f}"
         if feedrate is not None:
             command += f" F{feedrate:.3f}"
-        if comment is not None:
+        if comment is not None and not self.strip_comments:
             command += f" ({comment})"
 
-        # Append the generated command to the G code list
-        self.gcode.append(command)
+        # Append the generated command to the G code
+        self._emit(command)
 
     def parse_circle_array(self, circle_array_data, toolpath_data, origin_offset):
         """
@@ -131,80 +634,7 @@ class GCodePostProcessor:
         if circle_array_data.get("type") != "circle array":
             raise ValueError("The input data is not a circle array.")
 
-        # Extract circle array parameters (defined in mm). Convert to inches if units not metric.
-        if self.units == "metric":
-            D = circle_array_data["D"]
-            d = circle_array_data["d"]
-            n = circle_array_data["n"]
-        else:
-            D = [x / 25.4 for x in circle_array_data["D"]]
-            d = [x / 25.4 for x in circle_array_data["d"]]
-            n = circle_array_data["n"]
-
-        # Extract toolpath parameters (already in the correct units).
-        safe_z = float(toolpath_data['safe_z'])
-        jog_feed_xyz = float(toolpath_data['jog_feed_xyz'])
-        cut_feed_xy = float(toolpath_data['cut_feed_xy'])
-        cut_feed_z = float(toolpath_data['cut_feed_z'])
-        depth_per_pass = float(toolpath_data['depth_per_pass'])
-        num_passes = int(toolpath_data['num_passes'])
-
-        # Extract origin offsets (defined in mm). Convert to inches if units not metric.
-        if self.units == "metric":
-            offset_x, offset_y = origin_offset
-        else:
-            offset_x = origin_offset(0) / 25.4
-            offset_y = origin_offset(1) / 25.4
-
-        # Add a comment for the main program
-        self.add_comment("MAIN PROGRAM - MACHINING OPERATIONS")
-
-        # For each ring:
-        for i in range(0, len(D)):
-
-            # Add a comment with the number of the current ring.
-            self.add_comment(f"------ Circle Array {i + 1} ------", indent_amount=1)
-            self.add_comment(f"Parameters: D={D[i]}, d={d[i]}, n={n[i]}", indent_amount=1)
-            self.add_linebreak()
-
-            # For each circle in the circle array:
-            angles = np.linspace(0, 2 * np.pi, n[i], endpoint=False)
-            for j in range(0, len(angles)):
-
-                # Add a comment with the number of the current circle.
-                self.add_comment(f"------ Circle {j + 1} of {n[i]} ------", indent_amount=2)
-
-                R = D[i] / 2.0
-                r = d[i] / 2.0
-
-                # Calculate starting/ending point (point nearest to center of pattern).
-                start_x = (R - r) * np.cos(angles[j])
-                start_y = (R - r) * np.sin(angles[j])
-                start_x_offset = start_x + offset_x  # to account for origin location
-                start_y_offset = start_y + offset_y  # to account for origin location
-
-                # Calculate center offsets relative to the starting point.
-                i_offset = r * np.cos(angles[j])
-                j_offset = r * np.sin(angles[j])
-
-                # For each pass
-                for p in range(1, num_passes + 1):
-                    # Add a comment with the number of the current pass.
-                    self.add_comment(f"Cut Pass {p} of {num_passes}", indent_amount=2)
-
-                    # Jog to starting XY at safe Z height.
-                    self.move_linear(z=safe_z, feedrate=jog_feed_xyz, comment="rapid move to safe Z", indent_amount=2)
-                    self.move_linear(x=start_x_offset, y=start_y_offset, feedrate=jog_feed_xyz,
-                                     comment="rapid move to XY start", indent_amount=2)
-
-                    # Plunge into material.
-                    self.move_linear(z=-p*depth_per_pass, feedrate=cut_feed_z, comment="Z plunge", indent_amount=2)
-
-                    # Cut arc in clockwise motion.
-                    self.move_arc(x=None, y=None, i=i_offset, j=j_offset, clockwise=True, feedrate=cut_feed_xy,
-                                  comment="clockwise arc", indent_amount=2)
-
-                    self.add_linebreak()
+        self.parse_toolpath(build_toolpath([circle_array_data], toolpath_data, self.units), origin_offset)
 
     def parse_roulette(self, roulette_data, toolpath_data, origin_offset):
         """
@@ -220,6 +650,12 @@ class GCodePostProcessor:
             6) G01: Move to successive XY points at XY feedrate until pattern is complete.
             Repeat steps (2)-(6) for specified number of passes.
 
+        Points are spaced evenly (cut_res points per closed path) or, if toolpath_data['sampling']
+        is 'adaptive', spaced so that no segment deviates from the curve by more than chord_tol.
+        If toolpath_data['roulette_moves'] is 'arc', the points are fitted with tangent-continuous
+        G02/G03 arcs within fit_tol, falling back to G01 only where no arc fits. If it is 'spline',
+        they are fitted with G5 cubic splines (LinuxCNC) in the same way.
+
         Args:
             roulette_data (dict): Dictionary of roulette parameters (defined in mm).
                                   example_data = {"type": "roulette",
@@ -235,113 +671,264 @@ class GCodePostProcessor:
                                                   "cut_feed_z": 1.0,
                                                   "depth_per_pass": 0.02,
                                                   "num_passes": 1,
-                                                  "cut_res": 200}
+                                                  "cut_res": 200,
+                                                  "sampling": "uniform",
+                                                  "chord_tol": 0.0005,
+                                                  "roulette_moves": "linear",
+                                                  "fit_tol": 0.0005}
             origin_offset (tuple): X and Y amounts (defined in mm) by which to translate
                                    pattern to account for origin location (dX, dY).
         """
 
-        def compute_point(theta):
-            """Helper function to compute the (x, y) point for a given theta."""
-            factor = (R + s * r)
-            x = factor * np.cos(theta) - s * d * np.cos(theta * factor / r)
-            y = factor * np.sin(theta) - d * np.sin(theta * factor / r)
-            return x, y
-
-        def lcm(a, b):
-            """Helper function to compute the least common multiple of two numbers."""
-            return (a * b) // math.gcd(a, b)
-
         # Ensure the input is a roulette
         if roulette_data.get("type") != "roulette":
             raise ValueError("The input data is not a roulette.")
 
-        # Extract roulette parameters (defined in mm). Convert to inches if units not metric.
-        if self.units == "metric":
-            R = roulette_data["R"]
-            r = roulette_data["r"]
-            s = roulette_data["s"]
-            d = roulette_data["d"]
-        else:
-            R = roulette_data["R"] / 25.4
-            r = roulette_data["r"] / 25.4
-            s = roulette_data["s"]
-            d = roulette_data["d"] / 25.4
-
-        # Extract toolpath parameters (already in correct units).
-        safe_z = float(toolpath_data['safe_z'])
-        jog_feed_xyz = float(toolpath_data['jog_feed_xyz'])
-        cut_feed_xy = float(toolpath_data['cut_feed_xy'])
-        cut_feed_z = float(toolpath_data['cut_feed_z'])
-        depth_per_pass = float(toolpath_data['depth_per_pass'])
-        num_passes = int(toolpath_data['num_passes'])
-        cut_res = int(toolpath_data['cut_res'])
-
-        # Extract origin offsets (defined in mm).
+        self.parse_toolpath(build_toolpath([roulette_data], toolpath_data, self.units), origin_offset)
+
+    def parse_toolpath(self, toolpath, origin_offset):
+        """
+        Write a toolpath built by toolpath.build_toolpath() as a series of G code commands.
+        Append the commands to the local G code program (or write them to the output stream).
+
+        Args:
+            toolpath (Toolpath or iterable): Moves and operations of one or more patterns (in the post
+                                             processor's units), or an iterable of toolpaths such as
+                                             toolpath.iter_operations(), which is consumed one operation
+                                             at a time.
+            origin_offset (tuple): X and Y amounts (defined in mm) by which to translate
+                                   pattern to account for origin location (dX, dY).
+        """
+        for _ in self._write_toolpath(toolpath, origin_offset):
+            pass
+
+    def iter_gcode(self, toolpath, origin_offset):
+        """
+        Generate the G code for a toolpath in chunks, one per cut pass, as it is produced.
+        Any lines added before the call (e.g. a title comment or start sequence) lead the first chunk.
+
+        Args:
+            toolpath (Toolpath or iterable): As for parse_toolpath().
+            origin_offset (tuple): As for parse_toolpath().
+
+        Yields:
+            str: Newline-terminated G code text.
+        """
+        if self.stream is not None:
+            raise ValueError("Cannot generate G code chunks while streaming to a file.")
+
+        for _ in self._write_toolpath(toolpath, origin_offset):
+            if self.gcode:
+                yield "\n".join(self.gcode) + "\n"
+                self.gcode.clear()
+
+    def _write_toolpath(self, toolpath, origin_offset):
+        """
+        Write a toolpath as G code, pausing (yielding) after each cut pass.
+        """
+        # Extract origin offsets (defined in mm). Convert to inches if units not metric.
         if self.units == "metric":
             offset_x, offset_y = origin_offset
         else:
-            offset_x = origin_offset(0) / 25.4
-            offset_y = origin_offset(1) / 25.4
+            offset_x = origin_offset[0] / 25.4
+            offset_y = origin_offset[1] / 25.4
 
         # Add a comment for the main program
         self.add_comment("MAIN PROGRAM - MACHINING OPERATIONS")
 
-        # Add a comment for the roulette.
-        self.add_comment("------ Roulette ------", indent_amount=1)
-        self.add_comment(f"Parameters: R={R}, r={r}, s={s}, d={d}, res={cut_res}", indent_amount=1)
-        self.add_linebreak()
+        # Formatted runs of line moves of the current operation, keyed by the op index, the position of the run
+        # in its pass and the modal state the run starts from. Passes of an operation only differ in depth, which
+        # line runs do not write, so every pass after the first reuses the text of the first.
+        run_cache = {}
+
+        previous_xy = (None, None)  # end of the last move of the previous part
+        for part in ([toolpath] if isinstance(toolpath, Toolpath) else toolpath):
+            if part.units != self.units:
+                raise ValueError("Toolpath units do not match the post processor units.")
+
+            for operation in part.operations:
+                num_passes = operation["num_passes"]
+                for start, stop in operation["passes"]:
+                    p = int(part.pass_number[start])
+                    if p == 1 and "travel" in operation:
+                        self._write_travel_comment(operation["travel"])
+                    if p == 1:
+                        self._write_operation_header(operation)
+
+                    # Add a comment with the number of the current pass. Helical passes ramp down in Z along
+                    # the cut moves, so those moves also carry Z words.
+                    ramp = operation["pass_strategy"] == "helical"
+                    if not ramp:
+                        self.add_comment(f"Cut Pass {p} of {num_passes}", indent_amount=2)
+                    elif p <= num_passes:
+                        self.add_comment(f"Helical Pass {p} of {num_passes}", indent_amount=2)
+                    else:
+                        self.add_comment("Cleanup Pass", indent_amount=2)
+
+                    kinds = part.kind[start:stop].tolist()
+                    op_index = int(part.op[start])
+                    if any(key[0] != op_index for key in run_cache):
+                        run_cache.clear()
+
+                    # Runs of consecutive line moves are formatted in one batch.
+                    line_runs = self._line_runs(part.kind[start:stop])
+
+                    n = 0
+                    while n < stop - start:
+                        # Cut moves with axis words are written as increments from the plunge point (if specified).
+                        if self.incremental and not self._relative and kinds[n] in INCREMENTAL_MOVES:
+                            self.set_distance_mode(True, indent_amount=2)
+
+                        if n in line_runs:
+                            end = line_runs[n]
+                            self._write_line_run(part, start + n, start + end, offset_x, offset_y,
+                                                 run_cache, (op_index, n), ramp)
+                            n = end
+                            continue
+
+                        # Offset the moves to account for origin location.
+                        kind, m = kinds[n], start + n
+                        x, y = float(part.x[m]) + offset_x, float(part.y[m]) + offset_y
+                        z, feed = float(part.z[m]), float(part.feed[m])
+                        cut_z = z if ramp else None
+                        i, j, p_word, q_word = float(part.i[m]), float(part.j[m]), float(part.p[m]), float(part.q[m])
+                        if kind == MOVE_RETRACT and self.rapids:
+                            self.move_rapid(z=z, comment="rapid move to safe Z", indent_amount=2)
+                        elif kind == MOVE_RETRACT:
+                            self.move_linear(z=z, feedrate=feed, comment="rapid move to safe Z", indent_amount=2)
+                        elif kind == MOVE_RAPID and self.rapids:
+                            self.move_rapid(x=x, y=y, comment="rapid move to XY start", indent_amount=2)
+                        elif kind == MOVE_RAPID:
+                            self.move_linear(x=x, y=y, feedrate=feed, comment="rapid move to XY start", indent_amount=2)
+                        elif kind == MOVE_PLUNGE:
+                            self.move_linear(z=z, feedrate=feed, comment="Z plunge", indent_amount=2)
+                        elif kind in (MOVE_ARC_CW, MOVE_ARC_CCW):
+                            # The arc starts where the previous move ended, which may be in the previous part.
+                            start_x, start_y = previous_xy if m == 0 else (float(part.x[m - 1]) + offset_x,
+                                                                           float(part.y[m - 1]) + offset_y)
+                            offsets = self._arc_offsets(start_x, start_y, x, y, i, j)
+                            if offsets is None:
+                                self.move_linear(x=x, y=y, z=cut_z, feedrate=feed, indent_amount=2)
+                            else:
+                                self.move_arc(x=x, y=y, z=cut_z, i=offsets[0], j=offsets[1],
+                                              clockwise=(kind == MOVE_ARC_CW), feedrate=feed, indent_amount=2)
+                        elif kind in (MOVE_CIRCLE_CW, MOVE_CIRCLE_CCW):
+                            clockwise = kind == MOVE_CIRCLE_CW
+                            self.move_arc(x=None, y=None, z=cut_z, i=i, j=j, clockwise=clockwise, feedrate=feed,
+                                          comment="clockwise arc" if clockwise else "counterclockwise arc",
+                                          indent_amount=2)
+                        elif kind == MOVE_CUBIC:
+                            self.move_cubic(x=x, y=y, i=i, j=j, p=p_word, q=q_word, feedrate=feed, indent_amount=2)
+                        n += 1
+
+                    if self._relative:
+                        self.set_distance_mode(False, indent_amount=2)
 
-        # Define R and r as fractions.
-        R = Fraction(R)
-        r = Fraction(r)
+                    self.add_linebreak()
+                    yield
 
-        # Compute the effective radius.
-        effective_R = R + s * r
+            if len(part.x):
+                previous_xy = (float(part.x[-1]) + offset_x, float(part.y[-1]) + offset_y)
 
-        # Compute the GCD of the numerators and the LCM of the denominators.
-        numerator_gcd = math.gcd(r.numerator, effective_R.numerator)
-        denominator_lcm = lcm(r.denominator, effective_R.denominator)
+    def _write_line_run(self, part, start, stop, offset_x, offset_y, run_cache, key, ramp=False):
+        """
+        Write a run of line moves, reusing the text of an identical run written before if there is one.
 
-        # Simplify as a fraction.
-        gcd_fraction = Fraction(numerator_gcd, denominator_lcm)
+        Args:
+            part (Toolpath): Toolpath holding the run.
+            start, stop (int): Range of the run in the toolpath.
+            offset_x, offset_y (float): Origin offset, in output units.
+            run_cache (dict): Runs written before; updated with this run.
+            key (tuple): Identifies the run within its operation (the same for the run in every pass).
+            ramp (bool): If True, also write the Z targets of the moves.
+        """
+        columns = (part.x[start:stop], part.y[start:stop], part.feed[start:stop])
+        if ramp:
+            columns += (part.z[start:stop],)
+        names = ("G", "X", "Y", "Z", "F") if ramp else ("G", "X", "Y", "F")
+        state = (self._relative,) + tuple(self._modal[name] for name in names)
+        cached = run_cache.get(key + state)
+        if cached is not None and all(np.array_equal(a, b) for a, b in zip(cached[0], columns)):
+            _, block, count, modal = cached
+            self._modal.update(modal)
+        else:
+            feeds = columns[2]
+            if np.all(feeds == feeds[0]):
+                feeds = float(feeds[0])
+            block, count = self._linear_batch_block(columns[0] + offset_x, columns[1] + offset_y,
+                                                    z=columns[3] if ramp else None, feedrate=feeds, indent_amount=2)
+            modal = {name: self._modal[name] for name in names}
+            run_cache[key + state] = (columns, block, count, modal)
+        self._emit_block(block, count)
+
+    @staticmethod
+    def _line_runs(kinds):
+        """
+        Find runs of consecutive line moves.
 
-        # Simplify the GCD as a fraction.
-        gcd_fraction = Fraction(numerator_gcd, denominator_lcm)
+        Args:
+            kinds (np.ndarray): Move kinds.
 
-        # Calculate the number of turns needed to close the path.
-        n_turns = r / gcd_fraction
-        total_angle = n_turns * 2 * np.pi
-        thetas = np.linspace(0, total_angle, cut_res, endpoint=False)
+        Returns:
+            dict: Maps the start index of each run to its (exclusive) end index.
+        """
+        is_line = np.concatenate(([False], kinds == MOVE_LINE, [False]))
+        edges = np.flatnonzero(is_line[1:] != is_line[:-1])
+        return dict(zip(edges[0::2].tolist(), edges[1::2].tolist()))
 
-        for p in range(1, num_passes + 1):
-            # Add a comment with the number of the current pass.
-            self.add_comment(f"Cut Pass {p} of {num_passes}", indent_amount=2)
+    def _write_travel_comment(self, travel):
+        """
+        Add a comment comparing the rapid travel between contours before and after travel-order optimization.
 
-            # Compute the starting point.
-            first_x, first_y = compute_point(thetas[0])
-            start_x, start_y = first_x, first_y
-            start_x_offset = start_x + offset_x  # to account for origin location
-            start_y_offset = start_y + offset_y  # to account for origin location
+        Args:
+            travel (dict): Travel distances "before" and "after" optimization, from toolpath.iter_operations().
+        """
+        self.travel = travel
+        unit = "mm" if self.units == "metric" else "in"
+        self.add_comment(f"Travel order optimized: {travel['after']:.3f} {unit} of rapid travel "
+                         f"({travel['before']:.3f} {unit} in pattern order)", indent_amount=1)
+        self.add_linebreak()
 
-            # Jog to starting XY at safe Z height.
-            self.move_linear(z=safe_z, feedrate=jog_feed_xyz, comment="rapid move to safe Z", indent_amount=2)
-            self.move_linear(x=start_x_offset, y=start_y_offset, feedrate=jog_feed_xyz,
-                             comment="rapid move to XY start", indent_amount=2)
+    def _write_operation_header(self, operation):
+        """
+        Add the comments describing an operation (pattern parameters, closure and curve fit).
 
-            # Plunge into material.
-            self.move_linear(z=-p*depth_per_pass, feedrate=cut_feed_z, comment="Z plunge", indent_amount=2)
+        Args:
+            operation (dict): Operation metadata from toolpath.build_toolpath().
+        """
+        if operation["type"] == "roulette":
+            R, r, s, d = operation["R"], operation["r"], operation["s"], operation["d"]
+            cost = operation["cost"]
+            resolution_text = "{}={}".format(*operation["resolution"])
+
+            # Add a comment for the roulette.
+            self.add_comment("------ Roulette ------", indent_amount=1)
+            self.add_comment(f"Parameters: R={R}, r={r}, s={s}, d={d}, {resolution_text}", indent_amount=1)
+            self.add_comment(f"Closure: {cost['turns']} turns, {cost['lobes']} lobes, {cost['segments']} cut segments",
+                             indent_amount=1)
+
+            fit = operation["fit"]
+            if fit is not None:
+                self.add_comment(f"Curve fit: {fit['moves']} moves ({fit['curves']} {fit['curve_type']}), "
+                                 f"tol={fit['tol']}", indent_amount=1)
+
+            schedule = operation["feed_schedule"]
+            if schedule is not None:
+                self.add_comment(f"Curvature feed: {schedule['min']:.3f} to {schedule['max']:.3f}, "
+                                 f"floor={schedule['floor']}, ceiling={schedule['ceiling']}", indent_amount=1)
 
-            # Move to the next XY location.
-            for theta in thetas[1:]:
-                next_x, next_y = compute_point(theta)
-                next_x_offset = next_x + offset_x
-                next_y_offset = next_y + offset_y
-                self.move_linear(x=next_x_offset, y=next_y_offset, feedrate=cut_feed_xy, indent_amount=2)
+            self.add_linebreak()
 
-            # Close the pattern by moving back to the starting point.
-            self.move_linear(x=start_x_offset, y=start_y_offset, feedrate=cut_feed_xy, indent_amount=2)
+        elif operation["type"] == "circle":
+            # Add a comment with the number of the current ring.
+            if operation["first_in_ring"]:
+                self.add_comment(f"------ Circle Array {operation['ring'] + 1} ------", indent_amount=1)
+                self.add_comment(f"Parameters: D={operation['D']}, d={operation['d']}, n={operation['count']}",
+                                 indent_amount=1)
+                self.add_linebreak()
 
-            self.add_linebreak()
+            # Add a comment with the number of the current circle.
+            self.add_comment(f"------ Circle {operation['index'] + 1} of {operation['count']} ------", indent_amount=2)
 
     def get_gcode(self):
         """
@@ -365,6 +952,8 @@ class GCodePostProcessor:
         Args:
             filename (str): The name of the destination file.
         """
+        if self.stream is not None:
+            raise ValueError("G code is being streamed; use close_file() instead.")
 
         # Ensure the filename has a .nc file extension.
         if not filename.endswith(".nc"):
@@ -376,10 +965,44 @@ class GCodePostProcessor:
 
         print(f"G code saved to {filename}")
 
+    def open_file(self, filename):
+        """
+        Stream all subsequently generated G code to a file through a write buffer, so that memory use
+        does not grow with the program length and the first lines reach the file immediately.
+        Must be called before any G code is generated.
+
+        Args:
+            filename (str): The name of the destination file.
+        """
+        if self._line_count:
+            raise ValueError("G code has already been generated.")
+
+        # Ensure the filename has a .nc file extension.
+        if not filename.endswith(".nc"):
+            filename += ".nc"
+
+        self.filename = filename
+        self.stream = open(filename, "w", buffering=STREAM_BUFFER_SIZE)
+
+    def close_file(self, discard=False):
+        """
+        Finish streaming to the file opened by open_file().
+
+        Args:
+            discard (bool): If True, delete the partially written file (e.g. after an error).
+        """
+        self.stream.close()
+        self.stream = None
+
+        if discard:
+            os.remove(self.filename)
+        else:
+            print(f"G code saved to {self.filename}")
+
 
 # Example usage
 if __name__ == "__main__":
-    post_processor = GCodePostProcessor()
+    post_processor = GCodePostProcessor("metric")
     post_processor.add_comment('MAIN PROGRAM - MACHINING OPERATIONS')
     post_processor.move_linear(x=10, y=20, z=5, feedrate=1500)
     post_processor.move_arc(x=15, y=25, i=2.5, j=2.5, clockwise=True, feedrate=1200)
@@ -387,3 +1010,52 @@ if __name__ == "__main__":
 
     # Save the G code to a file
     post_processor.save_to_file("output.nc")
+
+    # Benchmark batch formatting of G01 blocks against one move_linear() call per move.
+    theta = np.linspace(0, 40 * np.pi, 200000)
+    xs = 60 * np.cos(theta) * np.cos(0.05 * theta)
+    ys = 60 * np.sin(theta) * np.cos(0.05 * theta)
+
+    per_call = GCodePostProcessor("metric")
+    start = time.perf_counter()
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        per_call.move_linear(x=x, y=y, feedrate=2.0, indent_amount=2)
+    per_call_time = time.perf_counter() - start
+
+    batch = GCodePostProcessor("metric")
+    start = time.perf_counter()
+    batch.move_linear_batch(xs, ys, feedrate=2.0, indent_amount=2)
+    batch_time = time.perf_counter() - start
+
+    assert batch.get_gcode() == per_call.get_gcode(), "Batch output differs from per-call output."
+    print(f"{len(xs)} G01 blocks: per-call {per_call_time * 1000:.0f} ms, batch {batch_time * 1000:.0f} ms "
+          f"({per_call_time / batch_time:.1f}x faster, byte-identical)")
+
+    # Compare the program size with modal compaction.
+    compact = GCodePostProcessor("metric", compact=True, strip_comments=True)
+    compact.move_linear_batch(xs, ys, feedrate=2.0, indent_amount=2)
+    print(f"Compact output: {len(compact.get_gcode())} bytes vs. {len(batch.get_gcode())} bytes")
+
+    # Compare the program size in incremental distance mode, for a pattern far from the origin.
+    for incremental in (False, True):
+        offset_program = GCodePostProcessor("metric", compact=True, strip_comments=True, incremental=incremental)
+        offset_program.move_linear(x=float(xs[0]) + 150, y=float(ys[0]) + 150, z=-0.5)
+        if incremental:
+            offset_program.set_distance_mode(True)
+        offset_program.move_linear_batch(xs[1:] + 150, ys[1:] + 150, feedrate=2.0)
+        print(f"{'Incremental' if incremental else 'Absolute'} compact output, offset pattern: "
+              f"{len(offset_program.get_gcode())} bytes")
+
+    # Measure the cost of each extra cut pass; passes after the first reuse the formatted text of the first.
+    roulette = {"type": "roulette", "R": 40.0, "r": 13.3, "s": -1, "d": 18.0}
+    times = {}
+    for num_passes in (1, 10):
+        toolpath_data = {"safe_z": 5.0, "jog_feed_xyz": 1000.0, "cut_feed_xy": 300.0, "cut_feed_z": 100.0,
+                         "depth_per_pass": 0.2, "num_passes": num_passes, "cut_res": 20000}
+        toolpath = build_toolpath([roulette], toolpath_data)
+        passes = GCodePostProcessor("metric")
+        start = time.perf_counter()
+        passes.parse_toolpath(toolpath, (150.0, 150.0))
+        times[num_passes] = time.perf_counter() - start
+    print(f"{len(toolpath)} moves over 10 passes: first pass {times[1] * 1000:.1f} ms, "
+          f"each extra pass {(times[10] - times[1]) / 9 * 1000:.1f} ms")
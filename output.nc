@@ -0,0 +1,4 @@
+(MAIN PROGRAM - MACHINING OPERATIONS)
+G01 X10.000 Y20.000 Z5.000 F1500.000
+G02 X15.000 Y25.000 I2.500 J2.500 F1200.000
+G01 X0.000 Y0.000 Z0.000 F1000.000
\ No newline at end of file
@@ -0,0 +1,408 @@
+import numpy as np
+
+
+# Segment kinds produced by the fitting routines.
+SEGMENT_LINE = 0
+SEGMENT_ARC_CW = 1
+SEGMENT_ARC_CCW = 2
+SEGMENT_CUBIC = 3
+
+# Number of points sampled along each fitted arc or curve when checking it against the polyline.
+ARC_CHECK_POINTS = 8
+
+
+def estimate_tangents(xs, ys, closed=True):
+    """
+    Estimate unit tangent vectors at each point of a polyline using central differences.
+
+    Args:
+        xs, ys (np.ndarray): Point coordinates.
+        closed (bool): True if the polyline wraps around from the last point to the first.
+
+    Returns:
+        tuple: Arrays (tx, ty) of unit tangent components.
+    """
+    if closed:
+        tx = np.roll(xs, -1) - np.roll(xs, 1)
+        ty = np.roll(ys, -1) - np.roll(ys, 1)
+    else:
+        tx = np.gradient(xs)
+        ty = np.gradient(ys)
+
+    length = np.hypot(tx, ty)
+    length[length == 0] = 1.0
+    return tx / length, ty / length
+
+
+def _arc_from_tangent(px, py, tx, ty, qx, qy):
+    """
+    Find the circular arc that leaves point P along unit tangent T and ends at point Q.
+
+    Returns:
+        tuple: (cx, cy, radius, clockwise), or None if the arc is a straight line.
+    """
+    vx, vy = qx - px, qy - py
+    chord_sq = vx * vx + vy * vy
+    denominator = 2.0 * (-ty * vx + tx * vy)  # twice the projection of the chord onto the left normal
+    if chord_sq == 0 or abs(denominator) <= 1e-9 * np.sqrt(chord_sq):
+        return None
+
+    signed_radius = chord_sq / denominator
+    cx = px - ty * signed_radius
+    cy = py + tx * signed_radius
+    return cx, cy, abs(signed_radius), signed_radius < 0
+
+
+def _biarc(p0, t0, p1, t1):
+    """
+    Build a biarc: two tangent-continuous pieces joining P0 (tangent T0) to P1 (tangent T1).
+
+    Returns:
+        list: Pieces (start, end, arc), where arc is (cx, cy, radius, clockwise) or None for a line.
+    """
+    vx, vy = p1[0] - p0[0], p1[1] - p0[1]
+    sx, sy = t0[0] + t1[0], t0[1] + t1[1]
+    v_dot_t = vx * sx + vy * sy
+    v_dot_v = vx * vx + vy * vy
+    t0_dot_t1 = t0[0] * t1[0] + t0[1] * t1[1]
+
+    # Solve for equal tangent arm lengths (the standard "equal chord" biarc).
+    if abs(1.0 - t0_dot_t1) < 1e-12:
+        v_dot_t1 = vx * t1[0] + vy * t1[1]
+        if abs(v_dot_t1) < 1e-12:
+            return None
+        arm = v_dot_v / (4.0 * v_dot_t1)
+    else:
+        denominator = 2.0 * (1.0 - t0_dot_t1)
+        arm = (-v_dot_t + np.sqrt(v_dot_t * v_dot_t + denominator * v_dot_v)) / denominator
+
+    # Junction point between the two arcs.
+    jx = 0.5 * (p0[0] + arm * t0[0] + p1[0] - arm * t1[0])
+    jy = 0.5 * (p0[1] + arm * t0[1] + p1[1] - arm * t1[1])
+
+    first = _arc_from_tangent(p0[0], p0[1], t0[0], t0[1], jx, jy)
+    second = _arc_from_tangent(p1[0], p1[1], -t1[0], -t1[1], jx, jy)  # traced backwards from P1
+    if second is not None:
+        cx, cy, radius, clockwise = second
+        second = (cx, cy, radius, not clockwise)  # reverse direction to run from the junction to P1
+
+    return [(p0, (jx, jy), first), ((jx, jy), p1, second)]
+
+
+def _sweep(start, end, arc):
+    """Return the swept angle (radians, >= 0) from start to end in the arc's direction."""
+    cx, cy, _, clockwise = arc
+    a0 = np.arctan2(start[1] - cy, start[0] - cx)
+    a1 = np.arctan2(end[1] - cy, end[0] - cx)
+    sweep = (a0 - a1) if clockwise else (a1 - a0)
+    return np.mod(sweep, 2 * np.pi)
+
+
+def _piece_points(start, end, arc, n):
+    """Sample n points strictly inside a fitted piece."""
+    f = np.arange(1, n + 1) / (n + 1.0)
+    if arc is None:
+        return start[0] + f * (end[0] - start[0]), start[1] + f * (end[1] - start[1])
+
+    cx, cy, radius, clockwise = arc
+    a0 = np.arctan2(start[1] - cy, start[0] - cx)
+    direction = -1.0 if clockwise else 1.0
+    angles = a0 + direction * f * _sweep(start, end, arc)
+    return cx + radius * np.cos(angles), cy + radius * np.sin(angles)
+
+
+def _distance_to_piece(px, py, start, end, arc):
+    """Distance from points to a fitted piece (line segment or arc)."""
+    if arc is None:
+        return _distance_to_segments(px, py, np.array([start[0]]), np.array([start[1]]),
+                                     np.array([end[0]]), np.array([end[1]]))
+
+    cx, cy, radius, clockwise = arc
+    total = _sweep(start, end, arc)
+    a0 = np.arctan2(start[1] - cy, start[0] - cx)
+    angles = np.arctan2(py - cy, px - cx)
+    progress = np.mod((a0 - angles) if clockwise else (angles - a0), 2 * np.pi)
+
+    radial = np.abs(np.hypot(px - cx, py - cy) - radius)
+    endpoint = np.minimum(np.hypot(px - start[0], py - start[1]), np.hypot(px - end[0], py - end[1]))
+    return np.where(progress <= total, radial, endpoint)
+
+
+def _distance_to_segments(px, py, ax, ay, bx, by):
+    """Distance from each point to the nearest of a set of line segments."""
+    ex, ey = bx - ax, by - ay
+    length_sq = ex * ex + ey * ey
+    length_sq[length_sq == 0] = 1.0
+
+    # Project every point onto every segment (points along rows, segments along columns).
+    t = ((px[:, None] - ax[None, :]) * ex[None, :] + (py[:, None] - ay[None, :]) * ey[None, :]) / length_sq[None, :]
+    t = np.clip(t, 0.0, 1.0)
+    dx = px[:, None] - (ax[None, :] + t * ex[None, :])
+    dy = py[:, None] - (ay[None, :] + t * ey[None, :])
+    return np.min(np.hypot(dx, dy), axis=1)
+
+
+def _biarc_fits(xs, ys, tx, ty, a, b, tolerance, min_radius):
+    """
+    Try to replace points a..b with a single biarc.
+
+    Returns:
+        list: Biarc pieces if every point lies within tolerance of the biarc and the biarc stays
+              within tolerance of the polyline; otherwise None.
+    """
+    pieces = _biarc((xs[a], ys[a]), (tx[a], ty[a]), (xs[b], ys[b]), (tx[b], ty[b]))
+    if pieces is None:
+        return None
+
+    # Very small arcs are unreliable once their coordinates are rounded for output.
+    if any(arc is not None and arc[2] < min_radius for _, _, arc in pieces):
+        return None
+
+    # Polyline points must lie on the biarc.
+    if b - a > 1:
+        px, py = xs[a + 1:b], ys[a + 1:b]
+        distance = np.minimum(_distance_to_piece(px, py, *pieces[0]), _distance_to_piece(px, py, *pieces[1]))
+        if np.max(distance) > tolerance:
+            return None
+
+    # The biarc must not bulge away from the polyline between points.
+    for start, end, arc in pieces:
+        qx, qy = _piece_points(start, end, arc, ARC_CHECK_POINTS)
+        distance = _distance_to_segments(qx, qy, xs[a:b], ys[a:b], xs[a + 1:b + 1], ys[a + 1:b + 1])
+        if np.max(distance) > tolerance:
+            return None
+
+    return pieces
+
+
+def _cubic_fits(xs, ys, tx, ty, a, b, tolerance):
+    """
+    Try to replace points a..b with a single cubic Bezier that keeps the end tangents.
+
+    The handle lengths are chosen by least squares over chord-length parameters (Schneider's
+    method), falling back to a third of the span length when the system is degenerate.
+
+    Returns:
+        tuple: Control points ((c1x, c1y), (c2x, c2y)) if every point lies within tolerance of the
+               curve and the curve stays within tolerance of the polyline; otherwise None.
+    """
+    px, py = xs[a:b + 1], ys[a:b + 1]
+    lengths = np.hypot(np.diff(px), np.diff(py))
+    span_length = np.sum(lengths)
+    if span_length == 0:
+        return None
+
+    t = np.concatenate(([0.0], np.cumsum(lengths))) / span_length
+    b0, b1, b2, b3 = (1 - t) ** 3, 3 * t * (1 - t) ** 2, 3 * t * t * (1 - t), t ** 3
+
+    # Least-squares handle lengths along the fixed end tangents.
+    alpha1 = alpha2 = span_length / 3.0
+    if b - a >= 2:
+        a1x, a1y = tx[a] * b1, ty[a] * b1
+        a2x, a2y = -tx[b] * b2, -ty[b] * b2
+        rx = px - (px[0] * (b0 + b1) + px[-1] * (b2 + b3))
+        ry = py - (py[0] * (b0 + b1) + py[-1] * (b2 + b3))
+        c11 = np.sum(a1x * a1x + a1y * a1y)
+        c12 = np.sum(a1x * a2x + a1y * a2y)
+        c22 = np.sum(a2x * a2x + a2y * a2y)
+        x1 = np.sum(a1x * rx + a1y * ry)
+        x2 = np.sum(a2x * rx + a2y * ry)
+        det = c11 * c22 - c12 * c12
+        if abs(det) > 1e-12 * max(c11 * c22, 1e-300):
+            alpha1_ls = (x1 * c22 - x2 * c12) / det
+            alpha2_ls = (c11 * x2 - c12 * x1) / det
+            if alpha1_ls > 1e-6 * span_length and alpha2_ls > 1e-6 * span_length:
+                alpha1, alpha2 = alpha1_ls, alpha2_ls
+
+    c1 = (px[0] + alpha1 * tx[a], py[0] + alpha1 * ty[a])
+    c2 = (px[-1] - alpha2 * tx[b], py[-1] - alpha2 * ty[b])
+
+    # Polyline points must lie on the curve.
+    if b - a > 1:
+        qx = b0 * px[0] + b1 * c1[0] + b2 * c2[0] + b3 * px[-1]
+        qy = b0 * py[0] + b1 * c1[1] + b2 * c2[1] + b3 * py[-1]
+        if np.max(np.hypot(qx - px, qy - py)) > tolerance:
+            return None
+
+    # The curve must not bulge away from the polyline between points.
+    f = np.arange(1, ARC_CHECK_POINTS + 1) / (ARC_CHECK_POINTS + 1.0)
+    qx = (1 - f) ** 3 * px[0] + 3 * f * (1 - f) ** 2 * c1[0] + 3 * f * f * (1 - f) * c2[0] + f ** 3 * px[-1]
+    qy = (1 - f) ** 3 * py[0] + 3 * f * (1 - f) ** 2 * c1[1] + 3 * f * f * (1 - f) * c2[1] + f ** 3 * py[-1]
+    if np.max(_distance_to_segments(qx, qy, px[:-1], py[:-1], px[1:], py[1:])) > tolerance:
+        return None
+
+    return c1, c2
+
+
+def _prepare_polyline(xs, ys, closed):
+    """Convert points to float arrays with tangents, repeating the first point at the end if closed."""
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    tx, ty = estimate_tangents(xs, ys, closed=closed)
+    if closed:
+        xs, ys = np.append(xs, xs[0]), np.append(ys, ys[0])
+        tx, ty = np.append(tx, tx[0]), np.append(ty, ty[0])
+    return xs, ys, tx, ty
+
+
+def _greedy_spans(last, try_span):
+    """
+    Split points 0..last into the longest consecutive spans accepted by try_span.
+
+    From each start point the span is grown exponentially, then bisected for the longest span
+    that still fits.
+
+    Args:
+        last (int): Index of the final point.
+        try_span (callable): try_span(a, b) returns a fit for points a..b, or None if it does not fit.
+
+    Yields:
+        tuple: (a, b, fit), where fit is None if no span starting at a fits (b is then a + 1).
+    """
+    a = 0
+    while a < last:
+        good_b, good_fit, bad_b = None, None, None
+        span = 1
+        while True:
+            b = min(a + span, last)
+            fit = try_span(a, b)
+            if fit is None:
+                bad_b = b
+                break
+            good_b, good_fit = b, fit
+            if b == last:
+                break
+            span *= 2
+
+        if good_b is not None and bad_b is not None:
+            lo, hi = good_b, bad_b
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                fit = try_span(a, mid)
+                if fit is None:
+                    hi = mid
+                else:
+                    lo, good_fit = mid, fit
+            good_b = lo
+
+        if good_b is None:
+            yield a, a + 1, None
+            a += 1
+        else:
+            yield a, good_b, good_fit
+            a = good_b
+
+
+def fit_arcs(xs, ys, tolerance, closed=True, min_radius=0.0):
+    """
+    Approximate a polyline with tangent-continuous circular arcs (biarcs) within a tolerance.
+
+    Spans of points are grown greedily from the current point while a single biarc still fits.
+    Consecutive biarcs share the estimated tangent at their common point, so the fitted path is
+    tangent-continuous wherever arcs meet. Where no biarc fits (e.g. across a cusp), a straight
+    line to the next point is used instead.
+
+    Args:
+        xs, ys (np.ndarray): Point coordinates.
+        tolerance (float): Maximum deviation between the polyline and the fitted path.
+        closed (bool): True if the path returns from the last point to the first.
+        min_radius (float): Smallest arc radius to emit. Spans needing tighter arcs use lines.
+
+    Returns:
+        dict: Arrays {"kind", "x", "y", "cx", "cy"} describing each fitted segment.
+              "x"/"y" are segment end points; "cx"/"cy" are arc centers (NaN for lines).
+    """
+    xs, ys, tx, ty = _prepare_polyline(xs, ys, closed)
+
+    kinds, end_x, end_y, center_x, center_y = [], [], [], [], []
+
+    def add_piece(end, arc):
+        if arc is None:
+            kinds.append(SEGMENT_LINE)
+            center_x.append(np.nan)
+            center_y.append(np.nan)
+        else:
+            kinds.append(SEGMENT_ARC_CW if arc[3] else SEGMENT_ARC_CCW)
+            center_x.append(arc[0])
+            center_y.append(arc[1])
+        end_x.append(end[0])
+        end_y.append(end[1])
+
+    def try_span(a, b):
+        return _biarc_fits(xs, ys, tx, ty, a, b, tolerance, min_radius)
+
+    for a, b, pieces in _greedy_spans(len(xs) - 1, try_span):
+        if pieces is None:
+            # No biarc fits, even over a single segment. Fall back to a line.
+            add_piece((xs[b], ys[b]), None)
+        else:
+            for _, end, arc in pieces:
+                add_piece(end, arc)
+
+    return {"kind": np.array(kinds, dtype=np.uint8),
+            "x": np.array(end_x),
+            "y": np.array(end_y),
+            "cx": np.array(center_x),
+            "cy": np.array(center_y)}
+
+
+def fit_cubic_beziers(xs, ys, tolerance, closed=True):
+    """
+    Approximate a polyline with tangent-continuous cubic Bezier curves within a tolerance.
+
+    Spans of points are grown greedily from the current point while a single cubic still fits,
+    so each lobe of a roulette is typically covered by a handful of curves. Consecutive curves
+    share the estimated tangent at their common point. Where no cubic fits (e.g. across a cusp),
+    a straight line to the next point is used instead.
+
+    Args:
+        xs, ys (np.ndarray): Point coordinates.
+        tolerance (float): Maximum deviation between the polyline and the fitted path.
+        closed (bool): True if the path returns from the last point to the first.
+
+    Returns:
+        dict: Arrays {"kind", "x", "y", "c1x", "c1y", "c2x", "c2y"} describing each fitted segment.
+              "x"/"y" are segment end points; "c1"/"c2" are the control points (NaN for lines).
+    """
+    xs, ys, tx, ty = _prepare_polyline(xs, ys, closed)
+
+    kinds, end_x, end_y, c1x, c1y, c2x, c2y = [], [], [], [], [], [], []
+
+    def try_span(a, b):
+        return _cubic_fits(xs, ys, tx, ty, a, b, tolerance)
+
+    for a, b, controls in _greedy_spans(len(xs) - 1, try_span):
+        if controls is None:
+            # No cubic fits, even over a single segment. Fall back to a line.
+            kinds.append(SEGMENT_LINE)
+            controls = ((np.nan, np.nan), (np.nan, np.nan))
+        else:
+            kinds.append(SEGMENT_CUBIC)
+        c1x.append(controls[0][0])
+        c1y.append(controls[0][1])
+        c2x.append(controls[1][0])
+        c2y.append(controls[1][1])
+        end_x.append(xs[b])
+        end_y.append(ys[b])
+
+    return {"kind": np.array(kinds, dtype=np.uint8),
+            "x": np.array(end_x),
+            "y": np.array(end_y),
+            "c1x": np.array(c1x),
+            "c1y": np.array(c1y),
+            "c2x": np.array(c2x),
+            "c2y": np.array(c2y)}
+
+
+# Example usage
+if __name__ == "__main__":
+    from roulette_geometry import compute_roulette
+
+    x, y = compute_roulette(R=5.0, r=2.0, s=-1, d=1.5, resolution=2000)
+    segments = fit_arcs(x, y, tolerance=0.005)
+    n_arcs = int(np.sum(segments["kind"] != SEGMENT_LINE))
+    print(f"Fitted {len(x)} points with {len(segments['kind'])} segments ({n_arcs} arcs).")
+
+    curves = fit_cubic_beziers(x, y, tolerance=0.005)
+    n_cubics = int(np.sum(curves["kind"] == SEGMENT_CUBIC))
+    print(f"Fitted {len(x)} points with {len(curves['kind'])} segments ({n_cubics} cubic Beziers).")
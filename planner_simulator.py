@@ -0,0 +1,246 @@
+import numpy as np
+import time
+from toolpath import (Toolpath, COLUMNS, build_toolpath, CUT_MOVES, MOVE_RETRACT, MOVE_RAPID, MOVE_LINE, MOVE_ARC_CW,
+                      MOVE_ARC_CCW, MOVE_CIRCLE_CW, MOVE_CIRCLE_CCW, MOVE_CUBIC)
+
+
+# Junction speeds below this are raised to it, as GRBL does (units/s, squared).
+MINIMUM_JUNCTION_SPEED_SQ = 0.0
+
+# Relative amount by which the planned speed at a junction must fall short of the speed it would have with
+# unlimited lookahead to count as buffer starvation.
+STARVATION_TOLERANCE = 0.01
+
+
+def toolpath_blocks(toolpath, arc_tolerance=0.002, cubic_segments=16, rapid_feed=None):
+    """
+    Split a toolpath into the straight blocks a controller plans: lines as they are, arcs and circles into
+    chords within the arc tolerance (as GRBL does), cubics into equal parameter steps.
+
+    Args:
+        toolpath (Toolpath): Toolpath to split.
+        arc_tolerance (float): Maximum distance between an arc and its chords.
+        cubic_segments (int): Number of chords per cubic.
+        rapid_feed (float, optional): Traverse rate (units/min) of rapid moves written as G00. If None, rapid
+                                      moves run at their programmed feedrate.
+
+    Returns:
+        tuple: (points, feeds, moves) where points has shape (n + 1, 3) and holds the start of the first block
+               followed by the end of every block, feeds holds the nominal feedrate (units/min) of each block
+               and moves the index of the toolpath move each block belongs to.
+    """
+    kind = toolpath.kind
+    x0, y0, z0 = (np.concatenate(([np.nan], column[:-1])) for column in (toolpath.x, toolpath.y, toolpath.z))
+
+    # Moves from an unknown position (before the first contour) are skipped.
+    valid = np.flatnonzero(~np.isnan(x0) & ~np.isnan(toolpath.x))
+    kind, x0, y0, z0 = kind[valid], x0[valid], y0[valid], z0[valid]
+    x, y, z = toolpath.x[valid], toolpath.y[valid], toolpath.z[valid]
+    i, j, p, q = toolpath.i[valid], toolpath.j[valid], toolpath.p[valid], toolpath.q[valid]
+
+    # Angles swept by arcs and circles around their centers (negative for clockwise).
+    curved = np.isin(kind, (MOVE_ARC_CW, MOVE_ARC_CCW, MOVE_CIRCLE_CW, MOVE_CIRCLE_CCW))
+    clockwise = (kind == MOVE_ARC_CW) | (kind == MOVE_CIRCLE_CW)
+    radius = np.where(curved, np.hypot(i, j), 0.0)
+    start_angle = np.arctan2(-j, -i)
+    sweep = (np.arctan2(y - (y0 + j), x - (x0 + i)) - start_angle) * np.where(clockwise, -1, 1) % (2 * np.pi)
+    sweep = np.where((kind == MOVE_CIRCLE_CW) | (kind == MOVE_CIRCLE_CCW), 2 * np.pi, sweep)
+    sweep = np.where(clockwise, -sweep, sweep)
+
+    # Number of blocks per move.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        step = 2 * np.arccos(np.clip(1 - arc_tolerance / radius, -1, 1))
+        arc_count = np.ceil(np.abs(sweep) / step)
+    count = np.where(curved, np.maximum(np.nan_to_num(arc_count, nan=1.0), 1), 1)
+    count = np.where(kind == MOVE_CUBIC, cubic_segments, count).astype(int)
+
+    owner = np.repeat(np.arange(len(kind)), count)
+    t = (np.arange(len(owner)) - np.repeat(np.cumsum(count) - count, count) + 1) / count[owner]
+
+    # End point of each block. Lines end at the move end; the others follow their curve.
+    bx, by = x[owner].copy(), y[owner].copy()
+    bz = z0[owner] + (z[owner] - z0[owner]) * t
+    arcs = curved[owner]
+    angle = start_angle[owner][arcs] + sweep[owner][arcs] * t[arcs]
+    bx[arcs] = x0[owner][arcs] + i[owner][arcs] + radius[owner][arcs] * np.cos(angle)
+    by[arcs] = y0[owner][arcs] + j[owner][arcs] + radius[owner][arcs] * np.sin(angle)
+    cubics = kind[owner] == MOVE_CUBIC
+    tc = t[cubics]
+    for b, start, end, start_offset, end_offset in ((bx, x0, x, i, p), (by, y0, y, j, q)):
+        a, d = start[owner][cubics], end[owner][cubics]
+        b1, b2 = a + start_offset[owner][cubics], d + end_offset[owner][cubics]
+        b[cubics] = (1 - tc) ** 3 * a + 3 * (1 - tc) ** 2 * tc * b1 + 3 * (1 - tc) * tc ** 2 * b2 + tc ** 3 * d
+    # Make sure every move ends exactly at its end point.
+    ends = t == 1
+    bx[ends], by[ends], bz[ends] = x[owner][ends], y[owner][ends], z[owner][ends]
+
+    feeds = toolpath.feed[valid][owner]
+    if rapid_feed is not None:
+        feeds = np.where(np.isin(kind[owner], (MOVE_RETRACT, MOVE_RAPID)), rapid_feed, feeds)
+
+    if len(valid) == 0:
+        return np.zeros((0, 3)), np.zeros(0), np.zeros(0, dtype=int)
+    points = np.vstack(([x0[0], y0[0], z0[0]], np.column_stack((bx, by, bz))))
+    return points, feeds, valid[owner]
+
+
+def _axis_limited(acceleration, units):
+    """
+    Limit a value along each direction so that no axis component exceeds its maximum (GRBL's
+    limit_value_by_axis_maximum).
+    """
+    with np.errstate(divide="ignore"):
+        return np.min(np.asarray(acceleration, dtype=float) / np.abs(units), axis=1)
+
+
+def simulate_planner(toolpath, acceleration, junction_deviation=0.01, buffer_size=16, rapid_feed=None,
+                     arc_tolerance=0.002):
+    """
+    Simulate a GRBL-style lookahead planner running a toolpath, to predict the feed the machine achieves.
+
+    The toolpath is split into straight blocks (see toolpath_blocks()). The speed allowed at each junction
+    between blocks follows from the junction deviation and the acceleration along the junction; along each
+    block the speed changes at the acceleration the axes allow. When a block starts, the planner only sees the
+    blocks in its buffer and must be able to stop at the end of the last one, so a short buffer caps the speed
+    of short blocks. The planned speeds are found for all blocks at once: the backward pass through each buffer
+    window and the forward pass are both running minima of speeds (squared) less the cumulative speed change
+    the acceleration allows.
+
+    Args:
+        toolpath (Toolpath): Toolpath to run.
+        acceleration (tuple): Maximum acceleration of the X, Y and Z axes (units/s^2).
+        junction_deviation (float): Junction deviation (units).
+        buffer_size (int): Number of blocks in the planner buffer (including the executing block).
+        rapid_feed (float, optional): Traverse rate (units/min) of rapid moves written as G00. If None, rapid
+                                      moves run at their programmed feedrate.
+        arc_tolerance (float): Maximum distance between an arc and the chords it is split into (units).
+
+    Returns:
+        dict: "time" (total seconds), "cut_time" (seconds spent on cut moves) and per-block arrays: "points"
+              (block end points), "move" (index of the toolpath move), "nominal" (commanded speed), "entry" and
+              "exit" (planned speeds at the block ends) and "peak" (highest speed reached), all in units/s.
+              "starved" holds the indices of blocks whose exit speed is limited by the buffer depth rather than
+              by the path.
+    """
+    points, feeds, moves = toolpath_blocks(toolpath, arc_tolerance=arc_tolerance, rapid_feed=rapid_feed)
+    delta = np.diff(points, axis=0)
+    lengths = np.linalg.norm(delta, axis=1)
+
+    # Controllers drop blocks that do not move.
+    keep = lengths > 0
+    delta, lengths, feeds, moves = delta[keep], lengths[keep], feeds[keep], moves[keep]
+    points = np.vstack((points[:1], points[1:][keep]))
+    n = len(lengths)
+    if n == 0:
+        empty = np.zeros(0)
+        return {"time": 0.0, "cut_time": 0.0, "points": points[1:], "move": moves, "nominal": empty, "entry": empty,
+                "exit": empty, "peak": empty, "starved": np.zeros(0, dtype=int)}
+
+    units = delta / lengths[:, None]
+    nominal = feeds / 60.0
+    accel = _axis_limited(acceleration, units)
+
+    # Junction speed limits (squared) at the start of each block; the first block starts from rest.
+    cos_theta = -np.sum(units[1:] * units[:-1], axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        junction_units = units[1:] - units[:-1]
+        junction_units /= np.linalg.norm(junction_units, axis=1)[:, None]
+        junction_accel = _axis_limited(acceleration, np.nan_to_num(junction_units))
+        sin_theta_d2 = np.sqrt(0.5 * (1.0 - cos_theta))
+        junction = junction_accel * junction_deviation * sin_theta_d2 / (1.0 - sin_theta_d2)
+    junction = np.where(cos_theta < -0.999999, np.inf, np.where(cos_theta > 0.999999, 0.0, junction))
+    junction = np.maximum(junction, MINIMUM_JUNCTION_SPEED_SQ)
+    junction = np.minimum(junction, np.minimum(nominal[1:], nominal[:-1]) ** 2)
+    limit = np.concatenate(([0.0], junction, [0.0]))  # squared speed limit at each of the n + 1 block ends
+
+    # Cumulative change in squared speed the acceleration allows: D[k] over blocks 0..k-1.
+    change = 2.0 * accel * lengths
+    cumulative = np.concatenate(([0.0], np.cumsum(change)))
+    reach = limit + cumulative
+
+    # Backward pass for every buffer window at once. When block k starts, blocks k..k+size-1 are planned to
+    # stop at the end of the last one, which bounds the exit of block k by each later junction limit plus the
+    # speed change possible before it.
+    size = max(int(buffer_size), 1)
+    window_end = np.minimum(np.arange(n) + size, n)
+    bound = cumulative[window_end]  # stop at the end of the buffer
+    for offset in range(1, size):
+        at = np.minimum(np.arange(n) + offset, n)
+        bound = np.minimum(bound, np.where(at < window_end, reach[at], np.inf))
+    exit_limit = bound - cumulative[1:]
+
+    # The same bound with unlimited lookahead, to tell when the buffer is what limits the speed.
+    unlimited = np.minimum.accumulate(reach[::-1])[::-1][1:] - cumulative[1:]
+
+    # Forward pass: each block starts at the exit speed of the one before and can only accelerate so much.
+    # The leading 0 is the rest state at the start of the first block.
+    exit_sq = cumulative[1:] + np.minimum.accumulate(np.concatenate(([0.0], exit_limit - cumulative[1:])))[1:]
+    exit_sq = np.maximum(np.minimum(exit_sq, limit[1:]), 0.0)
+    entry_sq = np.concatenate(([0.0], exit_sq[:-1]))
+
+    # Trapezoidal speed profile along each block.
+    peak_sq = np.minimum(nominal ** 2, (entry_sq + exit_sq) / 2.0 + accel * lengths)
+    peak = np.sqrt(peak_sq)
+    entry, exit_speed = np.sqrt(entry_sq), np.sqrt(exit_sq)
+    ramp = (peak_sq - entry_sq) / (2 * accel) + (peak_sq - exit_sq) / (2 * accel)
+    block_time = (peak - entry) / accel + (peak - exit_speed) / accel + np.maximum(lengths - ramp, 0.0) / peak
+
+    # Starved blocks exit at the bound set by the end of the buffer, well below the bound the path sets.
+    starved = np.flatnonzero((exit_sq >= exit_limit * 0.999) & (exit_sq < unlimited * (1 - STARVATION_TOLERANCE) ** 2))
+    cut = np.isin(toolpath.kind[moves], CUT_MOVES)
+    return {"time": float(np.sum(block_time)), "cut_time": float(np.sum(block_time[cut])), "points": points[1:],
+            "move": moves, "nominal": nominal, "entry": entry, "exit": exit_speed, "peak": peak, "starved": starved}
+
+
+# Example usage
+if __name__ == "__main__":
+    roulette = {"type": "roulette", "R": 50.0, "r": 12.0, "s": -1, "d": 20.0}
+    acceleration = (100.0, 100.0, 50.0)
+    base = {"safe_z": 5.0, "jog_feed_xyz": 2000.0, "cut_feed_xy": 1500.0, "cut_feed_z": 300.0,
+            "depth_per_pass": 0.5, "num_passes": 1}
+
+    print("Setting                 blocks  time     mean feed  starved")
+    for label, settings in (("res=1000", {"cut_res": 1000}),
+                            ("res=4000", {"cut_res": 4000}),
+                            ("res=16000", {"cut_res": 16000}),
+                            ("res=4000, arcs 0.01", {"cut_res": 4000, "roulette_moves": "arc", "fit_tol": 0.01})):
+        toolpath = build_toolpath([roulette], dict(base, **settings))
+        start = time.perf_counter()
+        result = simulate_planner(toolpath, acceleration, junction_deviation=0.01, buffer_size=16)
+        elapsed = time.perf_counter() - start
+
+        # Mean achieved speed over the cut, as a share of the commanded feed.
+        cut = np.isin(toolpath.kind[result["move"]], CUT_MOVES)
+        lengths = np.linalg.norm(np.diff(np.vstack((result["points"][:1], result["points"])), axis=0), axis=1)
+        mean_feed = np.sum(lengths[cut]) / result["cut_time"] / (base["cut_feed_xy"] / 60.0)
+        print(f"{label:<22} {len(result['peak']):>7}  {result['time']:6.1f} s  {mean_feed:8.0%}  "
+              f"{len(result['starved']):>7}   ({elapsed * 1000:.0f} ms)")
+
+    # Every block must be feasible: no block leaves faster than its acceleration allows over its length (the
+    # first one starting from rest), and the speed profile of each block reaches its entry and exit speeds.
+    toolpath = build_toolpath([roulette], dict(base, cut_res=4000))
+    result = simulate_planner(toolpath, acceleration)
+    delta = np.diff(result["points"], axis=0)
+    lengths = np.linalg.norm(delta, axis=1)
+    accel = _axis_limited(acceleration, delta / lengths[:, None])
+    assert np.all(result["exit"][1:] ** 2 <= (result["entry"][1:] ** 2 + 2 * accel * lengths) * (1 + 1e-9)), \
+        "Blocks must not exit faster than they can accelerate."
+    assert np.all(result["peak"] >= np.maximum(result["entry"], result["exit"]) * (1 - 1e-9)), \
+        "Peak speeds must reach the entry and exit speeds."
+
+    # A short first block followed by a long collinear one: the first block exits at the speed reached from rest.
+    columns = {name: np.full(3, np.nan) for name, _ in COLUMNS}
+    columns.update(kind=np.full(3, MOVE_LINE), x=np.array([0.0, 0.1, 100.1]), y=np.zeros(3), z=np.zeros(3),
+                   feed=np.full(3, 3000.0), op=np.zeros(3), pass_number=np.ones(3))
+    result = simulate_planner(Toolpath(columns, []), (100.0, 100.0, 50.0))
+    assert result["exit"][0] ** 2 <= 2 * 100.0 * 0.1 * (1 + 1e-9), "The first block must start from rest."
+    assert np.all(result["peak"] >= np.maximum(result["entry"], result["exit"]) * (1 - 1e-9)), \
+        "Peak speeds must reach the entry and exit speeds."
+    print(f"Short first block: exit {result['exit'][0]:.2f} mm/s, {result['time']:.3f} s")
+
+    # With a deeper buffer the planner sees far enough ahead on short blocks.
+    toolpath = build_toolpath([roulette], dict(base, cut_res=16000))
+    for size in (4, 16, 64):
+        result = simulate_planner(toolpath, acceleration, buffer_size=size)
+        print(f"Buffer of {size:>2} blocks, res=16000: {result['time']:.1f} s, "
+              f"{len(result['starved'])} starved blocks")
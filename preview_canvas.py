@@ -1,8 +1,15 @@
 import tkinter as tk
 import numpy as np
-import re
 import math
-from fractions import Fraction
+import re
+import time
+from functools import partial
+from roulette_geometry import MIN_POINTS_PER_TURN
+from toolpath import build_toolpath
+
+# Maximum number of points in one canvas line item. Long curves are split into several items so that
+# each item keeps a small bounding box when only part of the canvas is redrawn.
+MAX_LINE_POINTS = 4096
 
 
 class PreviewCanvas(tk.Canvas):
@@ -29,7 +36,7 @@ class PreviewCanvas(tk.Canvas):
         self._set_origin_center()
 
         # Pattern settings
-        self.pattern = []
+        self.patterns = {}  # document of named patterns, drawn in the order they were first set
         self.pattern_color = "#000000"
         self.pattern_linewidth = 1
 
@@ -38,6 +45,18 @@ class PreviewCanvas(tk.Canvas):
         self.show_origin = True
         self.origin_position = (1, 1)  # center
 
+        # Scene of tagged layers drawn on the canvas
+        self.invalidate()
+
+        # Redraw scheduling: frames start at least frame_budget_ms apart, and a frame that took longer is
+        # followed by an equally long pause so that input events keep being handled.
+        self.frame_budget_ms = 40
+        self.frames_requested = 0
+        self.frames_rendered = 0
+        self._pending_updates = {}  # key: update to apply before the next frame (latest wins)
+        self._frame_job = None
+        self._frame_start = self._frame_end = None
+
     def _set_origin_center(self):
         self._origin_x = self._width / 2
         self._origin_y = self._height / 2
@@ -72,48 +91,149 @@ class PreviewCanvas(tk.Canvas):
         # Check if the list is empty or contains only empty dictionaries
         return len(lst) == 0 or all(isinstance(item, dict) and not item for item in lst)
 
-    def set_pattern(self, pattern):
+    def set_pattern(self, pattern, name="pattern"):
         """
-        Render multiple items on the canvas at once.
+        Set one pattern of the document shown on the canvas. The other patterns are kept, so that several
+        patterns (e.g. a circle array and a roulette) are previewed together; the next refresh only
+        updates the layers of the pattern that changed.
 
         Args:
-            pattern (list): List of drawing elements defined in millimeters.
-                            Each element must be a circle or line:
+            pattern (dict): Drawing element defined in millimeters (an empty dictionary shows nothing):
                             {'type': 'circle', 'x': <val>, 'y': <val>, 'radius': <val>}
                             {'type': 'line', 'x1': <val>, 'y1': <val>, 'x2': <val>, 'y2': <val>}
+                            {'type': 'circle array', 'D': [<val>, ...], 'd': [<val>, ...], 'n': [<val>, ...]}
+                            {'type': 'roulette', 'R': <val>, 'r': <val>, 's': <val>, 'd': <val>, 'display res': <val>}
+            name (str):     Name of the pattern in the document.
+        """
+        self.patterns[name] = pattern
 
-            color (str):    Line display color as string ("#FFF" or "#FFFFFF").
-            width (int):    Line display width in pixels.
+    def invalidate(self):
+        """
+        Clear the canvas and forget the scene, so that the next refresh draws every layer again.
         """
-        self.pattern = pattern
+        self.delete("all")
+        self._scene = {"bg_color": None,
+                       "style": None,
+                       "view": (self._origin_x, self._origin_y, self._mm_to_px_ratio),
+                       "crosshair": None,
+                       "layers": {}}  # tag: (key of the layer inputs, kinds of its canvas items)
 
     def refresh_pattern(self):
-        self.config(bg=self.bg_color)  # set background color
-        self.delete("all")  # clear the canvas
-
-        # Iterate through all elements in the pattern
-        if not self.is_pattern_empty(self.pattern):
+        """
+        Bring the canvas up to date with the current patterns and settings.
+
+        The canvas keeps its items between refreshes as a scene of tagged layers: the background, each ring
+        of a circle array and each roulette in the document, and the origin crosshair. Only the layers whose
+        inputs changed are updated. Style changes reconfigure the existing items, changes of scale or origin
+        move and scale them, and geometry is only recomputed for layers whose pattern parameters changed
+        (reusing their canvas items where it can). Editing one pattern leaves the layers of the others as
+        they are.
+        """
+        scene = self._scene
+
+        # Background layer
+        if scene["bg_color"] != self.bg_color:
+            self.config(bg=self.bg_color)  # set background color
+            scene["bg_color"] = self.bg_color
+
+        # Map the existing items from the previous origin and scale to the current ones.
+        view = (self._origin_x, self._origin_y, self._mm_to_px_ratio)
+        if scene["view"] != view:
+            origin_x, origin_y, ratio = scene["view"]
+            factor = self._mm_to_px_ratio / ratio
+            self.scale("pattern", origin_x, origin_y, factor, factor)
+            self.move("pattern", self._origin_x - origin_x, self._origin_y - origin_y)
+            scene["view"] = view
+
+        # Line color and width of every pattern layer
+        style = (self.pattern_color, self.pattern_linewidth)
+        if scene["style"] != style:
+            self.itemconfigure("lines", fill=self.pattern_color, width=self.pattern_linewidth)
+            self.itemconfigure("circles", outline=self.pattern_color, width=self.pattern_linewidth)
+            scene["style"] = style
+
+        # Pattern layers: drop the layers that are gone, then update the ones whose inputs changed.
+        layers = self._document_layers()
+        for tag in [tag for tag in scene["layers"] if tag not in layers]:
+            self.delete(tag)
+            del scene["layers"][tag]
+
+        created = False
+        for tag, (key, items) in layers.items():
+            if tag in scene["layers"] and scene["layers"][tag][0] == key:
+                continue
+            items = items()
+            kinds = tuple(kind for kind, _ in items)
+            if tag in scene["layers"] and scene["layers"][tag][1] == kinds:
+                for item, (_, coords) in zip(self.find_withtag(tag), items):
+                    self.coords(item, coords)
+            else:
+                self.delete(tag)
+                for kind, coords in items:
+                    self._create_item(tag, kind, coords)
+                created = True
+            scene["layers"][tag] = (key, kinds)
+
+        # Crosshair layer (kept above the pattern)
+        crosshair = (self.show_origin, self.origin_position, self._width, self._height)
+        if scene["crosshair"] != crosshair:
+            self.delete("crosshair")
+            if self.show_origin:
+                self._draw_crosshair(self.origin_position)
+            scene["crosshair"] = crosshair
+        elif created:
+            self.tag_raise("crosshair")
+
+    def schedule_refresh(self, update=None, key=None):
+        """
+        Request a refresh of the canvas. Requests are coalesced: the refresh runs once the application is
+        idle and the frame budget allows, and renders the latest state only. An update (e.g. reading
+        pattern widgets) can be deferred to the frame as well; a newer update with the same key replaces
+        a pending one, so stale intermediate states are never computed.
 
-            if self.pattern['type'] == 'circle':
-                self._draw_circle(self.pattern['x'], self.pattern['y'], self.pattern['radius'],
-                                  self.pattern_color, self.pattern_linewidth)
+        Args:
+            update (callable, optional): Function to call before the next frame is rendered.
+            key (hashable, optional): Key identifying the update.
+        """
+        self.frames_requested += 1
+        if update is not None:
+            self._pending_updates[key] = update
+        if self._frame_job is not None:
+            return
 
-            elif self.pattern['type'] == 'line':
-                self._draw_line(self.pattern['x1'], self.pattern['y1'], self.pattern['x2'],
-                                self.pattern['y2'], self.pattern_color, self.pattern_linewidth)
+        delay_ms = 0
+        if self._frame_start is not None:
+            earliest = max(self._frame_start + self.frame_budget_ms / 1000.0, 2 * self._frame_end - self._frame_start)
+            delay_ms = int(math.ceil((earliest - time.perf_counter()) * 1000.0))
+        if delay_ms > 0:
+            self._frame_job = self.after(delay_ms, self._idle_frame)
+        else:
+            self._frame_job = self.after_idle(self._render_frame)
 
-            elif self.pattern['type'] == 'circle array':
-                self._draw_circle_array(self.pattern['D'], self.pattern['d'], self.pattern['n'],
-                                        self.pattern_color, self.pattern_linewidth)
+    def flush_refresh(self):
+        """
+        Render a pending frame now (e.g. before the patterns are exported).
+        """
+        if self._frame_job is not None:
+            self.after_cancel(self._frame_job)
+            self._render_frame()
 
-            elif self.pattern['type'] == 'roulette':
-                self._draw_roulette(self.pattern['R'], self.pattern['r'], self.pattern['s'],
-                                    self.pattern['d'], self.pattern['display res'],
-                                    self.pattern_color, self.pattern_linewidth)
+    def _idle_frame(self):
+        # The frame budget has passed; render once pending input events have been handled.
+        self._frame_job = self.after_idle(self._render_frame)
 
-        # Draw crosshair
-        if self.show_origin:
-            self._draw_crosshair(self.origin_position)
+    def _render_frame(self):
+        """
+        Apply the pending updates and refresh the canvas.
+        """
+        self._frame_job = None
+        updates, self._pending_updates = self._pending_updates, {}
+        self._frame_start = time.perf_counter()
+        for update in updates.values():
+            update()
+        self.refresh_pattern()
+        self._frame_end = time.perf_counter()
+        self.frames_rendered += 1
 
     def _mm_to_px(self, mm):
         """
@@ -173,130 +293,162 @@ class PreviewCanvas(tk.Canvas):
         # Draw vertical line
         self.create_line(x, y - 10, x, y + 10, fill="red", width=3, tags="crosshair")
 
-    def _draw_roulette(self, R, r, s, d, display_res, color, width):
+    def _document_layers(self):
+        """
+        Describe the pattern layers of every pattern in the document. Layer tags are prefixed with the
+        name of their pattern, so each pattern keeps its own layers.
+
+        Returns:
+            dict: {tag: (key, items)} for each layer, as for _pattern_layers().
+        """
+        return {f"{name}-{tag}": layer for name, pattern in self.patterns.items()
+                for tag, layer in self._pattern_layers(pattern).items()}
+
+    def _pattern_layers(self, pattern):
         """
-        Render a roulette on the canvas.
+        Describe the layers of one pattern.
 
         Args:
-            R (float): Radius of the fixed circle.
-            r (float): Radius of the rolling circle.
-            s (int): Scaling factor for the rolling circle radius, either -1 or 1.
-            d (float): Distance of the pen point from the rolling circle center.
-            display_res (int): Resolution of the curve (number of points).
-            color (str): The display color of the line (#FFF or #FFFFFF).
-            width (int): The display width of the line in px.
+            pattern (dict): Drawing element defined in millimeters, as for set_pattern().
+
+        Returns:
+            dict: {tag: (key, items)} for each layer, where key identifies the inputs of the layer (in mm) and
+                  items is a function returning its canvas items as a list of (kind, pixel coordinates).
         """
-        def compute_point(theta):
-            """Helper function to compute the (x, y) point for a given theta."""
-            factor = (R + s * r)
-            x = factor * np.cos(theta) - s * d * np.cos(theta * factor / r)
-            y = factor * np.sin(theta) - d * np.sin(theta * factor / r)
-            return x, y
+        if self.is_pattern_empty(pattern):
+            return {}
 
-        # Define R and r as Fractions
-        R = Fraction(R)
-        r = Fraction(r)
+        if pattern['type'] == 'circle':
+            key = (pattern['x'], pattern['y'], pattern['radius'])
+            return {"circle": (key, lambda: [self._circle_item(*key)])}
 
-        # Compute the effective radius
-        effective_R = R + s * r
+        elif pattern['type'] == 'line':
+            key = (pattern['x1'], pattern['y1'], pattern['x2'], pattern['y2'])
+            return {"line": (key, lambda: self._polyline_items(np.array(key[::2]), np.array(key[1::2])))}
 
-        # Compute the GCD of the numerators and denominators
-        numerator_gcd = math.gcd(r.numerator, effective_R.numerator)
-        denominator_lcm = (r.denominator * effective_R.denominator) // math.gcd(r.denominator, effective_R.denominator)
+        elif pattern['type'] == 'circle array':
+            return {f"ring{k}": (ring, partial(self._circle_array_items, *ring))
+                    for k, ring in enumerate(zip(pattern['D'], pattern['d'], pattern['n']))}
 
-        # Simplify the GCD as a fraction
-        gcd_fraction = Fraction(numerator_gcd, denominator_lcm)
+        elif pattern['type'] == 'roulette':
+            key = (pattern['R'], pattern['r'], pattern['s'], pattern['d'], pattern['display res'])
+            return {"roulette": (key, partial(self._roulette_items, *key))}
 
-        # Calculate the number of turns needed to close the path.
-        n_turns = r / gcd_fraction
-        total_angle = n_turns * 2 * np.pi
-        thetas = np.linspace(0, total_angle, display_res, endpoint=False)
+        return {}
 
-        # Compute the starting point.
-        first_x, first_y = compute_point(thetas[0])
-        start_x, start_y = first_x, first_y
+    def _create_item(self, tag, kind, coords):
+        """
+        Create a canvas item of a pattern layer in the current pattern style.
 
-        # Draw the curve by connecting consecutive points.
-        for theta in thetas[1:]:
-            end_x, end_y = compute_point(theta)
-            self._draw_line(start_x, start_y, end_x, end_y, color, width)
-            start_x, start_y = end_x, end_y
+        Args:
+            tag (str): Tag of the layer.
+            kind (str): Either "line" or "oval".
+            coords (list): Pixel coordinates of the item.
+        """
+        if kind == "line":
+            self.create_line(coords, fill=self.pattern_color, width=self.pattern_linewidth, joinstyle=tk.ROUND,
+                             tags=(tag, "pattern", "lines"))
+        else:
+            self.create_oval(coords, outline=self.pattern_color, width=self.pattern_linewidth,
+                             tags=(tag, "pattern", "circles"))
+
+    def _roulette_items(self, R, r, s, d, display_res):
+        """
+        Compute the canvas items of a roulette.
+
+        Args:
+            R (float): Radius of the fixed circle.
+            r (float): Radius of the rolling circle.
+            s (int): Scaling factor for the rolling circle radius, either -1 or 1.
+            d (float): Distance of the pen point from the rolling circle center.
+            display_res (int): Resolution of the curve (number of points).
 
-        # Close the loop by connecting the last point to the first point.
-        self._draw_line(start_x, start_y, first_x, first_y, color, width)
+        Returns:
+            list: (kind, pixel coordinates) of each item.
+        """
+        # Limit the number of turns so that each turn keeps enough points to be legible;
+        # longer paths are truncated for display.
+        max_turns = max(1, display_res // MIN_POINTS_PER_TURN)
+        toolpath = build_toolpath([{"type": "roulette", "R": R, "r": r, "s": s, "d": d}],
+                                  {"cut_res": display_res, "max_turns": max_turns}, strict=False)
+        return self._toolpath_items(toolpath)
+
+    def _circle_array_items(self, D, d, n):
+        """
+        Compute the canvas items of one ring of a circle array.
+
+        Args:
+            D (float): Ring diameter, defined in mm.
+            d (float): Circle diameter, defined in mm.
+            n (int): Number of equally-spaced circles in the ring.
+
+        Returns:
+            list: (kind, pixel coordinates) of each item.
+        """
+        toolpath = build_toolpath([{"type": "circle array", "D": [D], "d": [d], "n": [n]}], {})
+        return self._toolpath_items(toolpath)
 
-    def _draw_circle_array(self, D, d, n, color, width):
+    def _toolpath_items(self, toolpath):
         """
-        Render multiple circle arrays on the canvas at once.
+        Compute the canvas items showing the first pass of every operation in a toolpath.
 
         Args:
-            D (list): Ring diameters, defined in mm. (float)
-            d (list): Circle diameters, defined in mm. (float)
-            n (list): Number of equally-spaced circles in array. (int)
-            color (str): The display color of the circle boundary (#FFF or #FFFFFF).
-            width (int): The display width of the circle boundary in px.
-        """
-        for i in range(0, len(D)):
-            angles = np.linspace(0, 2 * np.pi, n[i], endpoint=False)
-            for theta in angles:
-                center_x_mm = (D[i] / 2.0) * np.cos(theta)
-                center_y_mm = (D[i] / 2.0) * np.sin(theta)
-
-                center_x_px = self._origin_x + self._mm_to_px(center_x_mm)
-                center_y_px = self._origin_y - self._mm_to_px(center_y_mm)
-                radius_px = self._mm_to_px(d[i] / 2.0)
-
-                # Draw the circle with a border
-                self.create_oval(center_x_px - radius_px,
-                                 center_y_px - radius_px,
-                                 center_x_px + radius_px,
-                                 center_y_px + radius_px,
-                                 outline=color,
-                                 width=width)
-
-    def _draw_line(self, x1, y1, x2, y2, color, width):
-        """
-        Render a line on the canvas.
+            toolpath (Toolpath): Moves and operations from toolpath.build_toolpath() (defined in mm).
+
+        Returns:
+            list: (kind, pixel coordinates) of each item.
+        """
+        items = []
+        for op_index, operation in enumerate(toolpath.operations):
+            start_x, start_y, cut = toolpath.contour(op_index)
+
+            if operation["type"] == "circle":
+                # Full circle: the center is given relative to the start point.
+                items.append(self._circle_item(start_x + float(toolpath.i[cut.start]),
+                                               start_y + float(toolpath.j[cut.start]), operation["radius"]))
+            else:
+                # Draw the curve through consecutive points, ending back at the start point.
+                xs = np.concatenate(([start_x], toolpath.x[cut]))
+                ys = np.concatenate(([start_y], toolpath.y[cut]))
+                items.extend(self._polyline_items(xs, ys))
+        return items
+
+    def _polyline_items(self, xs, ys):
+        """
+        Compute the canvas items of a polyline: one line item per MAX_LINE_POINTS points, instead of one
+        item (and one Tcl call) per segment.
 
         Args:
-            x1 (float): The x-coordinate of the line's start point in mm.
-            y1 (float): The y-coordinate of the line's start point in mm.
-            x2 (float): The x-coordinate of the line's end point in mm.
-            y2 (float): The y-coordinate of the line's end point in mm.
-            color (str): The display color of the line (#FFF or #FFFFFF).
-            width (int): The display width of the line in px.
+            xs (np.ndarray): The x-coordinates of the points in mm.
+            ys (np.ndarray): The y-coordinates of the points in mm.
+
+        Returns:
+            list: (kind, pixel coordinates) of each item.
         """
-        x1_px = self._origin_x + self._mm_to_px(x1)
-        y1_px = self._origin_y - self._mm_to_px(y1)
-        x2_px = self._origin_x + self._mm_to_px(x2)
-        y2_px = self._origin_y - self._mm_to_px(y2)
+        coords = np.empty((len(xs), 2))
+        coords[:, 0] = self._origin_x + self._mm_to_px(xs)
+        coords[:, 1] = self._origin_y - self._mm_to_px(ys)
 
-        self.create_line(x1_px, y1_px, x2_px, y2_px, fill=color, width=width)
+        # Consecutive chunks share their end points so that the line stays connected.
+        return [("line", coords[start:start + MAX_LINE_POINTS].ravel().tolist())
+                for start in range(0, len(coords) - 1, MAX_LINE_POINTS - 1)]
 
-    def _draw_circle(self, x, y, radius, color, width):
+    def _circle_item(self, x, y, radius):
         """
-        Render a circle on the canvas.
+        Compute the canvas item of a circle.
 
         Args:
             x (float): The x-coordinate of the circle's center in mm.
             y (float): The y-coordinate of the circle's center in mm.
             radius (float): The radius of the circle in mm.
-            color (str): The display color of the circle boundary (#FFF or #FFFFFF).
-            width (int): The display width of the circle boundary in px.
+
+        Returns:
+            tuple: ("oval", bounding box in px).
         """
         x_px = self._origin_x + self._mm_to_px(x)
         y_px = self._origin_y - self._mm_to_px(y)
         r_px = self._mm_to_px(radius)
-
-        # Draw the circle with a border
-        self.create_oval(
-            x_px - r_px,
-            y_px - r_px,
-            x_px + r_px,
-            y_px + r_px,
-            outline=color,
-            width=width
-        )
+        return "oval", [x_px - r_px, y_px - r_px, x_px + r_px, y_px + r_px]
 
     def _valid_color(self, color):
         """
@@ -359,6 +511,61 @@ class PreviewCanvas(tk.Canvas):
     #     self._mm_to_px_ratio = value
 
 
+def benchmark_refresh(canvas, resolutions=(250, 1000, 4000, 16000), repeats=5):
+    """
+    Time refreshes of a roulette preview at several display resolutions: a full redraw with polylines, the
+    same curve drawn as one line item per segment for comparison, and a line width change that only
+    restyles the retained items.
+
+    Args:
+        canvas (PreviewCanvas): Canvas to draw on (its window must exist for the drawing to be rendered).
+        resolutions (tuple): Display resolutions (number of points) to time.
+        repeats (int): Number of refreshes timed per resolution; the fastest is reported.
+
+    Returns:
+        list: (resolution, polyline ms, per-segment ms, restyle ms, canvas items) for each resolution.
+    """
+    def fastest(action):
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            action()
+            canvas.update_idletasks()
+            best = min(best, time.perf_counter() - start)
+        return best * 1000
+
+    def redraw():
+        canvas.invalidate()
+        canvas.refresh_pattern()
+
+    def restyle():
+        canvas.set_pattern_linewidth(3 - canvas.pattern_linewidth)
+        canvas.refresh_pattern()
+
+    results = []
+    for display_res in resolutions:
+        roulette = {"type": "roulette", "R": 50.0, "r": 12.0, "s": -1, "d": 20.0, "display res": display_res}
+        canvas.set_pattern(roulette)
+        polyline_ms = fastest(redraw)
+        items = len(canvas.find_all())
+        restyle_ms = fastest(restyle)
+
+        # The same curve drawn one segment at a time.
+        coords = [coords for _, line in canvas._roulette_items(50.0, 12.0, -1, 20.0, display_res)
+                  for coords in zip(line[0::2], line[1::2])]
+
+        def draw_segments():
+            canvas.delete("all")
+            for (x1, y1), (x2, y2) in zip(coords[:-1], coords[1:]):
+                canvas.create_line(x1, y1, x2, y2, fill=canvas.pattern_color, width=canvas.pattern_linewidth)
+
+        segments_ms = fastest(draw_segments)
+        canvas.invalidate()
+
+        results.append((display_res, polyline_ms, segments_ms, restyle_ms, items))
+    return results
+
+
 # Main application demonstrating how to embed the class in an application.
 if __name__ == "__main__":
     root = tk.Tk()
@@ -378,15 +585,33 @@ if __name__ == "__main__":
     )
     canvas.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
 
+    # Time roulette refreshes against the number of points in the curve.
+    canvas.set_ratio(120)
+    root.update()
+    print("display res   polyline   per segment     restyle   canvas items")
+    for display_res, polyline_ms, segments_ms, restyle_ms, items in benchmark_refresh(canvas):
+        print(f"{display_res:11d} {polyline_ms:8.1f} ms {segments_ms:10.1f} ms {restyle_ms:8.1f} ms {items:14d}")
+
+    # Simulate a held spinbox arrow: 100 pattern changes, one every 10 ms.
+    start = time.perf_counter()
+    for k in range(100):
+        roulette = {"type": "roulette", "R": 50.0, "r": 12.0, "s": -1, "d": 10.0 + 0.1 * k, "display res": 16000}
+        canvas.schedule_refresh(partial(canvas.set_pattern, roulette), "roulette")
+        root.update()
+        time.sleep(0.01)
+    canvas.flush_refresh()
+    print(f"Held arrow: {canvas.frames_requested} frames requested, {canvas.frames_rendered} rendered "
+          f"in {time.perf_counter() - start:.2f} s")
+
     # Demonstrate drawing on the canvas.
     input("Press Enter to draw on the canvas...")
-    elements = [{'type': 'circle', 'x': 0, 'y': 0, 'radius': 5}]
-    canvas.draw_pattern(elements)
+    canvas.set_pattern({'type': 'circle', 'x': 0, 'y': 0, 'radius': 5})
+    canvas.refresh_pattern()
 
     # Example of updating properties after instantiation.
     input("Press Enter to demonstrate dynamic update of canvas properties...")
     canvas.width = 600  # Resize the canvas
-    canvas.draw_pattern(elements)
+    canvas.refresh_pattern()
 
     # Run the application
     root.mainloop()
@@ -0,0 +1,149 @@
+import tkinter as tk
+from tkinter import ttk
+from background_job import BackgroundJob
+
+
+class ProgressDialog(tk.Toplevel):
+    def __init__(self, parent, title, cancel_command=None, *args, **kwargs):
+        """
+        Dialog showing the progress of a background job, with a button to cancel it. The dialog does not
+        wait for the job: it grabs the input so that nothing else is started meanwhile, and is closed by
+        the owner of the job when the job finishes.
+
+        Args:
+            parent (tk.Tk): Parent window.
+            title (str): Title of the dialog.
+            cancel_command (callable, optional): Called when the Cancel button or the close button is pressed.
+        """
+        super().__init__(parent, *args, **kwargs)
+        self.parent = parent
+        self.title(title)
+        self.resizable(False, False)
+        self.transient(parent)  # keep dialog on top of main window
+        self.cancel_command = cancel_command
+
+        # Cancel the job when the close button is pressed
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        # Create a frame for the progress bar and the button
+        self.main_frame = tk.Frame(self)
+        self.main_frame.grid(row=0, column=0, padx=20, pady=10)
+
+        self.status_var = tk.StringVar(value="Starting...")
+        self.status_label = tk.Label(self.main_frame, textvariable=self.status_var, anchor="w", width=40)
+        self.status_label.grid(row=0, column=0, sticky="w", pady=(0, 5))
+
+        self.progress_bar = ttk.Progressbar(self.main_frame, orient="horizontal", length=300, mode="determinate",
+                                            maximum=1.0)
+        self.progress_bar.grid(row=1, column=0, sticky="ew", pady=5)
+
+        self.cancel_button = tk.Button(self.main_frame, text="Cancel", command=self.cancel, padx=10)
+        self.cancel_button.grid(row=2, column=0, pady=(10, 0))
+        self.bind("<Escape>", self.cancel)
+
+        # Position dialog at the center of the parent window.
+        self.update_idletasks()
+        if self.parent is not None:
+            self.geometry("+%d+%d" % (parent.winfo_rootx() + parent.winfo_width() / 2.0 - self.winfo_width() / 2.0,
+                                      parent.winfo_rooty() + parent.winfo_height() / 2.0 - self.winfo_height() / 2.0))
+
+        # Make dialog visible and direct all events to this window and its descendents.
+        self.deiconify()
+        self.focus_set()
+        self.wait_visibility()
+        self.grab_set()
+
+    def set_progress(self, fraction, text=""):
+        """
+        Show the progress of the job.
+
+        Args:
+            fraction (float): Fraction of the job done (0 to 1).
+            text (str): Description of the current step.
+        """
+        self.progress_bar["value"] = min(max(fraction, 0.0), 1.0)
+        if text:
+            self.status_var.set(text)
+
+    def cancel(self, event=None):
+        """Ask the job to stop. The dialog stays open until the job has stopped."""
+        self.status_var.set("Cancelling...")
+        self.cancel_button.config(state="disabled")
+        if self.cancel_command is not None:
+            self.cancel_command()
+
+    def close(self):
+        """Return focus to the parent window and close."""
+        self.grab_release()
+        if self.parent is not None:
+            self.parent.focus_set()
+        tk.Toplevel.destroy(self)
+
+
+def run_with_progress(parent, title, work, on_done=None, on_error=None, on_cancel=None):
+    """
+    Run a function as a background job while a progress dialog shows its progress and lets it be cancelled.
+
+    Args:
+        parent (tk.Tk): Parent window.
+        title (str): Title of the progress dialog.
+        work (callable): Function run on the worker thread, called as work(token, progress)
+                         (see BackgroundJob).
+        on_done (callable, optional): Called with the result of work() after the dialog closes.
+        on_error (callable, optional): Called with the exception raised by work() after the dialog closes.
+        on_cancel (callable, optional): Called after the dialog closes if the job was cancelled.
+
+    Returns:
+        BackgroundJob: The started job.
+    """
+    dialog = ProgressDialog(parent, title)
+
+    def finish(callback):
+        def handler(*args):
+            dialog.close()
+            if callback is not None:
+                callback(*args)
+        return handler
+
+    def error(e):
+        dialog.close()
+        if on_error is None:
+            raise e
+        on_error(e)
+
+    job = BackgroundJob(parent, work, on_progress=dialog.set_progress, on_done=finish(on_done), on_error=error,
+                        on_cancel=finish(on_cancel))
+    dialog.cancel_command = job.cancel
+    return job.start()
+
+
+class DemoApp(tk.Tk):
+    def __init__(self):
+        super().__init__()
+        self.title("Main Window")
+        self.geometry("300x200")
+        self.resizable(False, False)  # prevent resizing in both width and height
+
+        # Button to start a job
+        self.status_var = tk.StringVar(value="")
+        start_button = tk.Button(self, text="Start Job", command=self.start_job)
+        start_button.pack(pady=(50, 10))
+        tk.Label(self, textvariable=self.status_var).pack()
+
+    def start_job(self):
+        def work(token, progress):
+            total = 0
+            for k in range(100):
+                total += sum(range(100000))
+                progress((k + 1) / 100.0, f"Step {k + 1} of 100")
+            return total
+
+        run_with_progress(self, "Working", work,
+                          on_done=lambda result: self.status_var.set(f"Done: {result}"),
+                          on_cancel=lambda: self.status_var.set("Cancelled"))
+
+
+# Run the application
+if __name__ == "__main__":
+    app = DemoApp()
+    app.mainloop()
@@ -0,0 +1,498 @@
+import numpy as np
+import math
+import time
+from fractions import Fraction
+from functools import lru_cache
+from collections import namedtuple
+
+
+# Closure limits. Radii ratios within CLOSURE_TOLERANCE of a fraction with a denominator no
+# larger than MAX_TURNS are treated as exact; anything else is refused or truncated.
+CLOSURE_TOLERANCE = 1e-9
+MAX_TURNS = 200
+MIN_POINTS_PER_TURN = 8
+
+# Closure results are memoized. The cache comfortably holds the whole (R, r, s) grid
+# reachable through the Roulette Settings spinboxes (65 x 48 x 2 entries).
+CLOSURE_CACHE_SIZE = 8192
+
+# Basis arrays are memoized too, but each entry holds four arrays of the full resolution (about 13 MB
+# at 400,000 points), so the cache only keeps the few curves in use: the preview and an export.
+BASIS_CACHE_SIZE = 4
+
+# Adaptive sampling limits. The pilot grid resolves the fastest-turning term of the curve;
+# the final point count is capped to keep exports bounded.
+PILOT_POINTS_PER_REVOLUTION = 64
+MAX_ADAPTIVE_POINTS = 200000
+
+# Phasor evaluator block length. Within a block each term is advanced by repeated multiplication
+# with its unit step phasor; every block is re-anchored with an exact exp() to bound the drift.
+PHASOR_BLOCK_SIZE = 256
+
+Closure = namedtuple("Closure", ["turns", "total_angle", "truncated", "lobes", "symmetry"])
+
+
+def _approximate_ratio(value, tolerance, max_denominator):
+    """
+    Find the simplest fraction within tolerance of a value using its continued fraction expansion.
+
+    Args:
+        value (float): Value to approximate.
+        tolerance (float): Maximum absolute error of the approximation.
+        max_denominator (int): Largest denominator to consider.
+
+    Returns:
+        tuple: (Fraction, bool) with the approximation and whether it is within tolerance.
+    """
+    h_prev, h = 0, 1  # convergent numerators
+    k_prev, k = 1, 0  # convergent denominators
+    x = value
+    while True:
+        a = math.floor(x)
+        h_prev, h = h, a * h + h_prev
+        k_prev, k = k, a * k + k_prev
+
+        if k > max_denominator:
+            # Out of budget. Fall back to the best approximation with an allowed denominator.
+            return Fraction(value).limit_denominator(max_denominator), False
+
+        remainder = x - a
+        if abs(value - h / k) <= tolerance or remainder == 0:
+            return Fraction(h, k), True
+
+        x = 1 / remainder
+
+
+@lru_cache(maxsize=CLOSURE_CACHE_SIZE)
+def solve_closure(R, r, s, max_turns=MAX_TURNS, tolerance=CLOSURE_TOLERANCE, strict=False):
+    """
+    Compute the number of turns the rolling circle needs for the roulette to close, along
+    with the lobe count and rotational symmetry order of the closed path.
+
+    The path closes once the rolling circle has turned through whole multiples of
+    both 2*pi and 2*pi*r/(R + s*r), so the turn count is the denominator of the
+    reduced ratio (R + s*r)/r. The ratio is approximated to within the tolerance,
+    so radii that are not exact binary fractions (e.g. 2.3 or values converted to
+    inches) do not produce enormous turn counts.
+
+    With (R + s*r)/r = p/q in lowest terms, the path has |p - s*q| (= R/gcd(R, r)) lobes
+    and is unchanged by a rotation of 2*pi/lobes. Results are memoized, so repeated
+    lookups for the same spinbox values are O(1).
+
+    Args:
+        R (float): Radius of the fixed circle.
+        r (float): Radius of the rolling circle.
+        s (int): Rolling side, either -1 (inside) or 1 (outside).
+        max_turns (int): Largest number of turns to allow.
+        tolerance (float): Maximum error of the rational approximation of the radii ratio.
+        strict (bool): If True, raise an error when the path does not close within max_turns.
+                       Otherwise, truncate the path to the best approximation within max_turns.
+
+    Returns:
+        Closure: Named tuple (turns, total_angle, truncated, lobes, symmetry).
+    """
+    if float(r) <= 0:
+        raise ValueError("Rolling circle radius must be a positive value.")
+
+    ratio = (float(R) + s * float(r)) / float(r)
+    fraction, closed = _approximate_ratio(ratio, tolerance, max_turns)
+
+    if not closed and strict:
+        raise ValueError(f"Roulette does not close within {max_turns} turns. "
+                         f"Adjust the radii or increase the turn limit.")
+
+    turns = fraction.denominator
+    lobes = abs(fraction.numerator - s * turns)
+    return Closure(turns=turns, total_angle=turns * 2 * np.pi, truncated=not closed,
+                   lobes=lobes, symmetry=max(lobes, 1))
+
+
+def estimate_roulette_cost(R, r, s, resolution, num_passes=1, max_turns=MAX_TURNS, strict=False):
+    """
+    Estimate the size of a roulette before any geometry is generated.
+
+    Args:
+        R (float): Radius of the fixed circle.
+        r (float): Radius of the rolling circle.
+        s (int): Rolling side, either -1 (inside) or 1 (outside).
+        resolution (int): Number of points along the curve.
+        num_passes (int): Number of times the curve is traced.
+        max_turns (int): Largest number of turns to allow.
+        strict (bool): If True, raise an error for paths that do not close within max_turns
+                       or that are sampled too coarsely to be usable.
+
+    Returns:
+        dict: Estimated cost {"turns", "lobes", "truncated", "points", "segments", "points_per_turn"}.
+    """
+    closure = solve_closure(R, r, s, max_turns=max_turns, strict=strict)
+    points_per_turn = int(resolution) / closure.turns
+
+    if strict and points_per_turn < MIN_POINTS_PER_TURN:
+        raise ValueError(f"Roulette needs {closure.turns} turns to close, which leaves only "
+                         f"{points_per_turn:.1f} points per turn at a resolution of {int(resolution)}. "
+                         f"Increase the resolution to at least {closure.turns * MIN_POINTS_PER_TURN}.")
+
+    return {"turns": closure.turns,
+            "lobes": closure.lobes,
+            "truncated": closure.truncated,
+            "points": int(resolution),
+            "segments": int(resolution) * int(num_passes),
+            "points_per_turn": points_per_turn}
+
+
+def _rotate_copies(block_x, block_y, cos_a, sin_a):
+    """Rotate a block of points by each of a set of angles and concatenate the copies in order."""
+    x = cos_a[:, None] * block_x[None, :] - sin_a[:, None] * block_y[None, :]
+    y = sin_a[:, None] * block_x[None, :] + cos_a[:, None] * block_y[None, :]
+    return x.ravel(), y.ravel()
+
+
+def _phasor_sequence(omega, step, count, block_size=PHASOR_BLOCK_SIZE):
+    """
+    Compute exp(1j * omega * step * n) for n = 0..count-1 without a trig call per point.
+
+    Each block of block_size values is an exactly-computed anchor phasor times the powers of the
+    unit step phasor, which are built by repeated multiplication. Rounding error grows by about one
+    machine epsilon per multiplication, so the error stays below ~block_size * eps.
+
+    Args:
+        omega (float): Angular rate of the term relative to theta.
+        step (float): Theta increment between consecutive points.
+        count (int): Number of values.
+        block_size (int): Number of points between exact re-anchoring.
+
+    Returns:
+        np.ndarray: Complex unit phasors.
+    """
+    block_size = max(1, min(int(block_size), count))
+    n_blocks = -(-count // block_size)  # ceiling division
+
+    # Powers of the step phasor by repeated multiplication: 1, w, w**2, ...
+    powers = np.full(block_size, np.exp(1j * omega * step))
+    powers[0] = 1.0
+    powers = np.cumprod(powers)
+
+    # Exact anchors at the start of each block.
+    anchors = np.exp(1j * omega * step * block_size * np.arange(n_blocks))
+
+    return (anchors[:, None] * powers[None, :]).ravel()[:count]
+
+
+def phasor_error_bound(R, r, s, d, block_size=PHASOR_BLOCK_SIZE):
+    """
+    Estimate the worst-case absolute error of the phasor evaluator.
+
+    Args:
+        R (float): Radius of the fixed circle.
+        r (float): Radius of the rolling circle.
+        s (int): Rolling side, either -1 (inside) or 1 (outside).
+        d (float): Distance of the pen point from the rolling circle center.
+        block_size (int): Number of points between exact re-anchoring.
+
+    Returns:
+        float: Error bound in the same units as the radii.
+    """
+    amplitude = abs(float(R) + s * float(r)) + abs(float(d))
+    return amplitude * (int(block_size) + 2) * np.finfo(float).eps
+
+
+@lru_cache(maxsize=BASIS_CACHE_SIZE)
+def compute_roulette_basis(R, r, s, resolution, max_turns=MAX_TURNS, use_symmetry=True, evaluator="direct"):
+    """
+    Evaluate the pen-distance-independent terms of a closed roulette.
+
+    A roulette is linear in the pen distance d:
+        x = (R + s*r) * cos(theta) - s * d * cos(k * theta)
+        y = (R + s*r) * sin(theta) - d * sin(k * theta)
+    so it can be split into a base circle and a unit lobe term that is scaled by d.
+    Results are cached per (R, r, s, resolution), so changing only d reuses the trig work.
+
+    A closed roulette with m lobes is unchanged by a rotation of 2*pi*turns/m radians, which is
+    also the effect of advancing theta by 1/m of the period (both terms rotate by the same angle).
+    When the resolution is a multiple of m, only the first lobe is evaluated and the others are
+    produced by rotating it, cutting the trig work by a factor of m.
+
+    With evaluator="phasor", the curve is written as a sum of complex exponentials,
+        z = (R + s*r) * exp(1j*theta) - s * d * exp(1j*s*k*theta),
+    and each term is stepped by multiplication with its unit phasor (see _phasor_sequence()),
+    which avoids per-point trig calls for very long curves.
+
+    Args:
+        R (float): Radius of the fixed circle.
+        r (float): Radius of the rolling circle.
+        s (int): Rolling side, either -1 (inside) or 1 (outside).
+        resolution (int): Number of points along the curve.
+        max_turns (int): Largest number of turns to allow before the path is truncated.
+        use_symmetry (bool): If True, evaluate one lobe and rotate it to produce the others.
+        evaluator (str): "direct" for vectorized cos/sin, or "phasor" for the trig-free recurrence.
+
+    Returns:
+        tuple: Read-only arrays (base_x, base_y, lobe_x, lobe_y).
+    """
+    if evaluator not in ("direct", "phasor"):
+        raise ValueError("Evaluator must be 'direct' or 'phasor'.")
+
+    closure = solve_closure(R, r, s, max_turns=max_turns)
+    resolution = int(resolution)
+    thetas = np.linspace(0, closure.total_angle, resolution, endpoint=False)
+
+    factor = float(R) + s * float(r)
+    k = factor / float(r)
+
+    # The symmetry shortcut is skipped when the closure is truncated: truncated paths are not exactly periodic,
+    # so every point is evaluated. The phasor evaluator steps along the whole path and never uses the shortcut.
+    m = closure.symmetry
+    if evaluator == "phasor":
+        step = closure.total_angle / resolution
+        base = factor * _phasor_sequence(1.0, step, resolution)
+        lobe = -s * _phasor_sequence(s * k, step, resolution)
+
+        base_x, base_y = np.ascontiguousarray(base.real), np.ascontiguousarray(base.imag)
+        lobe_x, lobe_y = np.ascontiguousarray(lobe.real), np.ascontiguousarray(lobe.imag)
+    elif use_symmetry and m > 1 and resolution % m == 0 and not closure.truncated:
+        # Evaluate the fundamental lobe only.
+        block = thetas[:resolution // m]
+        block_base_x, block_base_y = factor * np.cos(block), factor * np.sin(block)
+        block_lobe_x, block_lobe_y = -s * np.cos(k * block), -np.sin(k * block)
+
+        # Rotation matrices for each copy of the lobe.
+        angles = (2 * np.pi * closure.turns / m) * np.arange(m)
+        cos_a, sin_a = np.cos(angles), np.sin(angles)
+
+        base_x, base_y = _rotate_copies(block_base_x, block_base_y, cos_a, sin_a)
+        lobe_x, lobe_y = _rotate_copies(block_lobe_x, block_lobe_y, cos_a, sin_a)
+    else:
+        base_x = factor * np.cos(thetas)
+        base_y = factor * np.sin(thetas)
+        lobe_x = -s * np.cos(k * thetas)
+        lobe_y = -np.sin(k * thetas)
+
+    # Protect the cached arrays from modification by callers.
+    for array in (base_x, base_y, lobe_x, lobe_y):
+        array.flags.writeable = False
+
+    return base_x, base_y, lobe_x, lobe_y
+
+
+def compute_roulette(R, r, s, d, resolution, max_turns=MAX_TURNS, evaluator="direct"):
+    """
+    Evaluate a closed roulette in a single vectorized pass.
+
+    The curve is sampled at evenly-spaced angles over one full period, without
+    repeating the starting point at the end. Only a multiply-add over the cached
+    basis arrays is needed when just the pen distance changes.
+
+    Args:
+        R (float): Radius of the fixed circle.
+        r (float): Radius of the rolling circle.
+        s (int): Rolling side, either -1 (inside) or 1 (outside).
+        d (float): Distance of the pen point from the rolling circle center.
+        resolution (int): Number of points along the curve.
+        max_turns (int): Largest number of turns to allow before the path is truncated.
+        evaluator (str): "direct" for vectorized cos/sin, or "phasor" for the trig-free recurrence.
+
+    Returns:
+        tuple: Contiguous arrays (x, y) of point coordinates.
+    """
+    base_x, base_y, lobe_x, lobe_y = compute_roulette_basis(float(R), float(r), int(s), int(resolution),
+                                                            int(max_turns), evaluator=evaluator)
+
+    # x = base_x + d * lobe_x (likewise for y), computed into fresh output arrays.
+    x = np.multiply(lobe_x, d)
+    x += base_x
+    y = np.multiply(lobe_y, d)
+    y += base_y
+
+    return x, y
+
+
+def evaluate_roulette(R, r, s, d, thetas):
+    """
+    Evaluate a roulette at arbitrary rolling angles.
+
+    Args:
+        R (float): Radius of the fixed circle.
+        r (float): Radius of the rolling circle.
+        s (int): Rolling side, either -1 (inside) or 1 (outside).
+        d (float): Distance of the pen point from the rolling circle center.
+        thetas (np.ndarray): Rolling angles in radians.
+
+    Returns:
+        tuple: Arrays (x, y) of point coordinates.
+    """
+    factor = float(R) + s * float(r)
+    k = factor / float(r)
+
+    x = factor * np.cos(thetas) - s * d * np.cos(k * thetas)
+    y = factor * np.sin(thetas) - d * np.sin(k * thetas)
+
+    return x, y
+
+
+def compute_roulette_derivatives(R, r, s, d, thetas):
+    """
+    Evaluate the analytic first and second derivatives of a roulette with respect to the rolling angle.
+
+    Args:
+        R (float): Radius of the fixed circle.
+        r (float): Radius of the rolling circle.
+        s (int): Rolling side, either -1 (inside) or 1 (outside).
+        d (float): Distance of the pen point from the rolling circle center.
+        thetas (np.ndarray): Rolling angles in radians.
+
+    Returns:
+        tuple: Arrays (dx, dy, ddx, ddy).
+    """
+    factor = float(R) + s * float(r)
+    k = factor / float(r)
+
+    cos_t, sin_t = np.cos(thetas), np.sin(thetas)
+    cos_k, sin_k = np.cos(k * thetas), np.sin(k * thetas)
+
+    dx = -factor * sin_t + s * d * k * sin_k
+    dy = factor * cos_t - d * k * cos_k
+    ddx = -factor * cos_t + s * d * k * k * cos_k
+    ddy = -factor * sin_t + d * k * k * sin_k
+
+    return dx, dy, ddx, ddy
+
+
+def compute_adaptive_angles(R, r, s, d, tolerance, max_turns=MAX_TURNS, strict=False):
+    """
+    Choose rolling angles so that no chord between consecutive points deviates from the curve
+    by more than the tolerance.
+
+    A chord spanning dtheta deviates from the curve by at most dtheta**2 * |z''| / 8, where
+    |z''|**2 = (kappa * speed**2)**2 + (d speed/dtheta)**2. The first term is the analytic
+    curvature of the trochoid; the second keeps cusps (where kappa diverges and speed vanishes)
+    well sampled. The resulting point density is integrated over a pilot grid, and points are
+    placed at equal increments of that integral: sparse on gentle arcs, dense in tight loops
+    and cusps.
+
+    Args:
+        R (float): Radius of the fixed circle.
+        r (float): Radius of the rolling circle.
+        s (int): Rolling side, either -1 (inside) or 1 (outside).
+        d (float): Distance of the pen point from the rolling circle center.
+        tolerance (float): Maximum chord deviation, in the same units as the radii.
+        max_turns (int): Largest number of turns to allow.
+        strict (bool): If True, raise an error for paths that do not close within max_turns
+                       or that need more than MAX_ADAPTIVE_POINTS points.
+
+    Returns:
+        np.ndarray: Rolling angles over one full period, without repeating the starting angle.
+    """
+    if tolerance <= 0:
+        raise ValueError("Chord tolerance must be a positive value.")
+
+    closure = solve_closure(R, r, s, max_turns=max_turns, strict=strict)
+
+    # Pilot grid fine enough to resolve the fastest-turning term of the curve.
+    factor = float(R) + s * float(r)
+    revolutions = closure.turns * max(1.0, abs(factor / float(r)))
+    n_pilot = int(np.ceil(PILOT_POINTS_PER_REVOLUTION * revolutions))
+    pilot = np.linspace(0, closure.total_angle, n_pilot + 1)
+
+    # Point density per radian: sqrt(|z''| / (8 * tolerance)).
+    _, _, ddx, ddy = compute_roulette_derivatives(R, r, s, d, pilot)
+    density = np.sqrt(np.hypot(ddx, ddy) / (8.0 * tolerance))
+
+    # The deviation bound uses the largest |z''| over each chord, so take the neighbourhood maximum.
+    density[1:-1] = np.maximum(density[1:-1], np.maximum(density[:-2], density[2:]))
+
+    # Keep a minimum number of points per turn so that near-straight stretches still close properly.
+    density = np.maximum(density, MIN_POINTS_PER_TURN / (2 * np.pi))
+
+    # Cumulative number of points along the pilot grid (trapezoidal integration).
+    cumulative = np.concatenate(([0.0], np.cumsum(0.5 * (density[1:] + density[:-1]) * np.diff(pilot))))
+    n_points = max(int(np.ceil(cumulative[-1])), MIN_POINTS_PER_TURN * closure.turns)
+
+    if n_points > MAX_ADAPTIVE_POINTS:
+        if strict:
+            raise ValueError(f"Roulette needs {n_points} points to meet a chord tolerance of {tolerance}. "
+                             f"Increase the tolerance.")
+        n_points = MAX_ADAPTIVE_POINTS
+
+    # Place points at equal increments of the cumulative density.
+    targets = np.linspace(0, cumulative[-1], n_points, endpoint=False)
+    return np.interp(targets, cumulative, pilot)
+
+
+def compute_roulette_adaptive(R, r, s, d, tolerance, max_turns=MAX_TURNS, strict=False):
+    """
+    Evaluate a closed roulette with curvature-adaptive point spacing.
+
+    Args:
+        R (float): Radius of the fixed circle.
+        r (float): Radius of the rolling circle.
+        s (int): Rolling side, either -1 (inside) or 1 (outside).
+        d (float): Distance of the pen point from the rolling circle center.
+        tolerance (float): Maximum chord deviation, in the same units as the radii.
+        max_turns (int): Largest number of turns to allow.
+        strict (bool): If True, raise an error for paths that are too long or too detailed.
+
+    Returns:
+        tuple: Contiguous arrays (x, y) of point coordinates.
+    """
+    thetas = compute_adaptive_angles(R, r, s, d, tolerance, max_turns=max_turns, strict=strict)
+    x, y = evaluate_roulette(R, r, s, d, thetas)
+    return np.ascontiguousarray(x), np.ascontiguousarray(y)
+
+
+# Example usage
+if __name__ == "__main__":
+    x, y = compute_roulette(R=5.0, r=2.0, s=-1, d=2.0, resolution=1000)
+    print(f"Computed {len(x)} points. First point: ({x[0]:.3f}, {y[0]:.3f})")
+
+    # Validate the symmetry-based evaluation against direct evaluation over the spinbox grid.
+    max_error = 0.0
+    n_symmetric = 0
+    for R in np.arange(0.5, 32.5, 0.5):
+        for r in np.arange(0.5, 24.5, 2.5):
+            for s in (-1, 1):
+                closure = solve_closure(R, r, s)
+                resolution = 60 * closure.symmetry
+                symmetric = compute_roulette_basis(R, r, s, resolution, use_symmetry=True)
+                direct = compute_roulette_basis(R, r, s, resolution, use_symmetry=False)
+                scale = max(1.0, abs(R + s * r))
+                max_error = max(max_error, max(np.max(np.abs(a - b)) / scale for a, b in zip(symmetric, direct)))
+                n_symmetric += closure.symmetry > 1
+    print(f"Symmetry check: {n_symmetric} symmetric cases, max relative error vs. direct evaluation {max_error:.2e}")
+    assert max_error < 1e-9, "Symmetry-based evaluation does not match direct evaluation."
+
+    # Benchmark the phasor evaluator on a long-period roulette (47 turns) against direct evaluation
+    # and against the original one-theta-at-a-time evaluation.
+    R, r, s, d, resolution = 31.5, 23.5, -1, 12.0, 500000
+    closure = solve_closure(R, r, s)
+    print(f"Benchmark: R={R}, r={r}, s={s}, d={d}, {closure.turns} turns, {resolution} points")
+
+    def compute_point(theta):
+        factor = (R + s * r)
+        return (factor * np.cos(theta) - s * d * np.cos(theta * factor / r),
+                factor * np.sin(theta) - d * np.sin(theta * factor / r))
+
+    n_scalar = 20000
+    thetas = np.linspace(0, closure.total_angle, resolution, endpoint=False)
+    start = time.perf_counter()
+    for theta in thetas[:n_scalar]:
+        compute_point(theta)
+    scalar_time = (time.perf_counter() - start) * resolution / n_scalar
+
+    timings = {}
+    results = {}
+    for evaluator in ("direct", "phasor"):
+        compute_roulette_basis.cache_clear()
+        start = time.perf_counter()
+        results[evaluator] = compute_roulette_basis(R, r, s, resolution, use_symmetry=False, evaluator=evaluator)
+        basis = results[evaluator]
+        x, y = basis[0] + d * basis[2], basis[1] + d * basis[3]
+        timings[evaluator] = time.perf_counter() - start
+        results[evaluator] = (x, y)
+
+    error = max(np.max(np.abs(results["phasor"][0] - results["direct"][0])),
+                np.max(np.abs(results["phasor"][1] - results["direct"][1])))
+    print(f"  scalar compute_point loop (extrapolated): {scalar_time * 1000:9.1f} ms")
+    print(f"  vectorized direct evaluation:             {timings['direct'] * 1000:9.1f} ms")
+    print(f"  phasor recurrence (block={PHASOR_BLOCK_SIZE}):          {timings['phasor'] * 1000:9.1f} ms "
+          f"({timings['direct'] / timings['phasor']:.1f}x faster than direct)")
+    print(f"  max error vs. direct: {error:.2e} (bound {phasor_error_bound(R, r, s, d):.2e})")
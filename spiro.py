@@ -1,10 +1,15 @@
 import tkinter as tk
 import os
+from functools import partial
+from tkinter import messagebox
 from user_controls import UserControlsPane
 from preview_canvas import PreviewCanvas
 from gcode_post_processor import GCodePostProcessor
 from svg_post_processor import SVGPostProcessor
+from toolpath import iter_operations, concatenate_toolpaths, count_operations
+from cycle_time import estimate_cycle_time
 from info_dialog import InfoDialog
+from progress_dialog import run_with_progress
 from status_bar import StatusBar
 from export_svg_dialog import ExportSVGDialog
 from export_gcode_dialog import ExportGCodeDialog
@@ -88,6 +93,9 @@ class SpiroScribeApp(tk.Tk):
         self.canvas.refresh_pattern()
 
     def open_export_svg_dialog(self):
+        # Apply pattern changes still waiting for the next preview frame.
+        self.canvas.flush_refresh()
+
         # Open Export SVG dialog.
         dialog = ExportSVGDialog(self)
 
@@ -103,22 +111,33 @@ class SpiroScribeApp(tk.Tk):
 
             # Initialize instance of SVG post processor.
             post_processor = SVGPostProcessor(units=self.workspace_units, svg_settings=export_settings)
+            patterns = [self.roulette, self.circle_array]
 
-            # Add roulette (if specified).
-            if self.roulette:
-                post_processor.parse_pattern(self.roulette)
+            def export(token, progress):
+                # Add roulette and circle arrays (if specified), reporting the progress (and taking a cancel)
+                # after each operation.
+                progress(0.0, "Generating patterns...")
+                operations = track_progress(post_processor.iter_operations(patterns), count_operations(patterns),
+                                            lambda fraction, text: progress(0.9 * fraction, text))
+                toolpath = concatenate_toolpaths(list(operations))
+                progress(0.9, "Writing SVG elements...")
+                post_processor.parse_toolpath(toolpath)
 
-            # Add circle arrays (if specified).
-            if self.circle_array:
-                post_processor.parse_pattern(self.circle_array)
+                # Export SVG to file.
+                progress(0.95, "Saving file...")
+                post_processor.save_to_file(export_settings['file_path'])
 
-            # Export SVG to file.
-            post_processor.save_to_file(export_settings['file_path'])
+            # Generate and save the SVG on a worker thread, so that the window stays responsive.
+            run_with_progress(self, "Export to SVG", export, on_error=partial(self.show_export_error, "Export to SVG"))
 
     def open_export_gcode_dialog(self):
+        # Apply pattern changes still waiting for the next preview frame.
+        self.canvas.flush_refresh()
+
         # Open Export G Code dialog.
         # TODO: Pass in initial values for the dialog.
-        dialog = ExportGCodeDialog(parent=self, units=self.workspace_units)
+        dialog = ExportGCodeDialog(parent=self, units=self.workspace_units,
+                                   cycle_time_estimator=self.estimate_gcode_cycle_time)
 
         # Retrieve settings from dialog.
         export_settings = dialog.get_settings()
@@ -126,42 +145,101 @@ class SpiroScribeApp(tk.Tk):
         # Export G code if settings are not empty.
         if export_settings:
             # Initialize instance of G code post processor.
-            post_processor = GCodePostProcessor(units=self.workspace_units)
-
-            # Add title comment (if specified).
-            if export_settings['title_comment']['include']:
-                post_processor.add_comment(export_settings['title_comment']['text'], apply_formatting=False)
-                post_processor.add_linebreak()
-
-            # Add start sequence (if specified).
-            if export_settings['start_sequence']['include']:
-                post_processor.add_comment(export_settings['start_sequence']['text'], apply_formatting=False)
-                post_processor.add_linebreak()
+            toolpath_parameters = export_settings['toolpath_parameters']
+            post_processor = GCodePostProcessor(units=self.workspace_units,
+                                                compact=bool(toolpath_parameters.get('compact_output', False)),
+                                                strip_comments=bool(toolpath_parameters.get('strip_comments', False)),
+                                                incremental=toolpath_parameters.get('distance_mode') == 'incremental',
+                                                rapids=bool(toolpath_parameters.get('rapid_moves', False)))
+            patterns = [self.circle_array, self.roulette]
 
             # Calculate origin offset.
             offset = self.compute_origin_offset(self.origin_position, self.workspace_dims)
 
-            # Add circle array (if specified).
-            if self.circle_array:
-                post_processor.parse_circle_array(circle_array_data=self.circle_array,
-                                                  toolpath_data=export_settings['toolpath_parameters'],
+            def export(token, progress):
+                # Stream the G code to the file.
+                post_processor.open_file(export_settings['file_path'])
+                try:
+                    # Add title comment (if specified).
+                    if export_settings['title_comment']['include']:
+                        post_processor.add_comment(export_settings['title_comment']['text'], apply_formatting=False)
+                        post_processor.add_linebreak()
+
+                    # Add start sequence (if specified).
+                    if export_settings['start_sequence']['include']:
+                        post_processor.add_comment(export_settings['start_sequence']['text'], apply_formatting=False)
+                        post_processor.add_linebreak()
+
+                    # Add the circle array and roulette (if specified), generating and writing one pass at a time.
+                    toolpath = iter_operations(patterns, toolpath_data=toolpath_parameters,
+                                               units=self.workspace_units, split_passes=True)
+                    post_processor.parse_toolpath(track_progress(toolpath, count_operations(patterns), progress),
                                                   origin_offset=offset)
 
-            # Add roulette (if specified).
-            if self.roulette:
-                post_processor.parse_roulette(roulette_data=self.roulette,
-                                              toolpath_data=export_settings['toolpath_parameters'],
-                                              origin_offset=offset)
+                    # Add end sequence (if specified).
+                    if export_settings['end_sequence']['include']:
+                        safe_z = toolpath_parameters['safe_z']
+                        end_sequence_unformatted = export_settings['end_sequence']['text']
+                        end_sequence_formatted = end_sequence_unformatted.replace("<safe_Z>", f"{safe_z}")
+                        post_processor.add_comment(end_sequence_formatted, apply_formatting=False)
+                except BaseException:
+                    # Discard the partial file of a refused or cancelled export.
+                    post_processor.close_file(discard=True)
+                    raise
+
+                # Finish writing the G code file.
+                post_processor.close_file()
+                return post_processor.travel
+
+            def report_travel(travel):
+                # Report the effect of travel-order optimization (if enabled).
+                if travel is not None:
+                    unit = "mm" if self.workspace_units == "metric" else "in"
+                    messagebox.showinfo("Export to G Code",
+                                        f"Rapid travel between contours: {travel['after']:.1f} {unit} "
+                                        f"(was {travel['before']:.1f} {unit} in pattern order).",
+                                        parent=self)
+
+            # Generate and write the G code on a worker thread, so that the window stays responsive.
+            run_with_progress(self, "Export to G Code", export, on_done=report_travel,
+                              on_error=partial(self.show_export_error, "Export to G Code"))
+
+    def show_export_error(self, title, error):
+        """
+        Report an export that was refused (a ValueError, e.g. a pattern that is too expensive to generate)
+        or that failed (any other error, e.g. a file that cannot be written).
+
+        Args:
+            title (str): Title of the message box.
+            error (Exception): Exception raised by the export.
+        """
+        if isinstance(error, ValueError):
+            messagebox.showerror(title, f"Export refused: {error}", parent=self)
+        else:
+            messagebox.showerror(title, f"Export failed ({type(error).__name__}): {error}", parent=self)
+
+    def estimate_gcode_cycle_time(self, toolpath_parameters, token):
+        """
+        Estimate the cycle time of the G code program for the current patterns. Run on a worker thread by the
+        Export G Code dialog.
 
-            # Add end sequence (if specified).
-            if export_settings['end_sequence']['include']:
-                safe_z = export_settings['toolpath_parameters']['safe_z']
-                end_sequence_unformatted = export_settings['end_sequence']['text']
-                end_sequence_formatted = end_sequence_unformatted.replace("<safe_Z>", f"{safe_z}")
-                post_processor.add_comment(end_sequence_formatted, apply_formatting=False)
+        Args:
+            toolpath_parameters (dict): Toolpath parameters from the Export G Code dialog.
+            token (CancelToken): Checked after each operation is generated.
 
-            # Save G code to file.
-            post_processor.save_to_file(export_settings['file_path'])
+        Returns:
+            float: Estimated cycle time in seconds.
+        """
+        operations = []
+        for operation in iter_operations([self.circle_array, self.roulette], toolpath_parameters,
+                                         units=self.workspace_units):
+            token.check()
+            operations.append(operation)
+        toolpath = concatenate_toolpaths(operations, self.workspace_units)
+        acceleration = (float(toolpath_parameters['accel_xy']), float(toolpath_parameters['accel_xy']),
+                        float(toolpath_parameters['accel_z']))
+        rapid_feed = float(toolpath_parameters['rapid_feed']) if toolpath_parameters.get('rapid_moves') else None
+        return estimate_cycle_time(toolpath, acceleration, rapid_feed=rapid_feed)["total"]
 
     def compute_origin_offset(self, origin_position, workspace_dims):
         width, height = workspace_dims
@@ -201,7 +279,7 @@ class SpiroScribeApp(tk.Tk):
             self.canvas.origin_position = settings['origin_position']
             self.canvas.show_origin = settings['show_origin']
             self.canvas.set_bg_color(settings['background_color'])
-            self.canvas.refresh_pattern()
+            self.canvas.schedule_refresh()
 
             # Update status bar.
             self.status_bar.origin_position = settings['origin_position']
@@ -222,7 +300,7 @@ class SpiroScribeApp(tk.Tk):
         """
         # Access the data attached to the event
         self.canvas.set_bg_color(event.widget.current_color)
-        self.canvas.refresh_pattern()
+        self.canvas.schedule_refresh()
 
     def handle_pattern_lw_event(self, event):
         """
@@ -230,25 +308,59 @@ class SpiroScribeApp(tk.Tk):
         event triggered by the pattern linewidth spinbox. Use the new linewidth.
         """
         self.canvas.set_pattern_linewidth(int(event.widget.pattern_linewidth))
-        self.canvas.refresh_pattern()
+        self.canvas.schedule_refresh()
 
     def handle_update_circle_event(self, event):
         """
         Redraw the pattern on the canvas in response to a <<UpdateCircleAction>>
-        event triggered by the widgets on the Circle Settings tab.
+        event triggered by the widgets on the Circle Settings tab. The widgets are
+        read when the next frame is rendered, so a burst of events reads them once.
         """
-        self.circle_array = event.widget.get_circle_array_data()
-        self.canvas.set_pattern(self.circle_array)
-        self.canvas.refresh_pattern()
+        self.canvas.schedule_refresh(partial(self.update_circle_array, event.widget), "circle_array")
 
     def handle_update_roulette_event(self, event):
         """
         Redraw the pattern on the canvas in response to a <<UpdateRouletteAction>>
-        event triggered by the widgets on the Roulette Settings tab.
+        event triggered by the widgets on the Roulette Settings tab. The widgets are
+        read when the next frame is rendered, so a burst of events reads them once.
         """
-        self.roulette = event.widget.get_roulette_data()
-        self.canvas.set_pattern(self.roulette)
-        self.canvas.refresh_pattern()
+        self.canvas.schedule_refresh(partial(self.update_roulette, event.widget), "roulette")
+
+    def update_circle_array(self, widget):
+        """
+        Read the circle array from the Circle Settings tab and set it on the canvas.
+        """
+        self.circle_array = widget.get_circle_array_data()
+        self.canvas.set_pattern(self.circle_array, "circle_array")
+
+    def update_roulette(self, widget):
+        """
+        Read the roulette from the Roulette Settings tab and set it on the canvas.
+        """
+        self.roulette = widget.get_roulette_data()
+        self.status_bar.update_pattern_info(self.roulette)
+        self.canvas.set_pattern(self.roulette, "roulette")
+
+
+def track_progress(toolpath, num_operations, progress):
+    """
+    Pass the parts of a toolpath through, reporting the progress after each one.
+
+    Args:
+        toolpath (iterable): Toolpaths from toolpath.iter_operations().
+        num_operations (int): Number of operations, from toolpath.count_operations().
+        progress (callable): Progress callback of a background job, called as progress(fraction, text).
+
+    Yields:
+        Toolpath: The parts of the toolpath.
+    """
+    for part in toolpath:
+        yield part
+        if len(part):
+            operation = part.operations[0]
+            op_index, pass_number = int(part.op[0]), int(part.pass_number[0])
+            fraction = (op_index + min(1.0, pass_number / operation["num_passes"])) / max(num_operations, 1)
+            progress(fraction, f"Operation {op_index + 1} of {num_operations}, pass {pass_number}")
 
 
 def center_window(window):
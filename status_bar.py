@@ -1,4 +1,5 @@
 import tkinter as tk
+from roulette_geometry import solve_closure
 
 
 class StatusBar(tk.Frame):
@@ -20,7 +21,8 @@ class StatusBar(tk.Frame):
 
         # Create the status bar
         self.grid_columnconfigure(0, weight=1)  # left column stretches
-        self.grid_columnconfigure(1, weight=0)  # right column (cursor position)
+        self.grid_columnconfigure(1, weight=0)  # middle column (pattern info)
+        self.grid_columnconfigure(2, weight=0)  # right column (cursor position)
         self.grid_rowconfigure(0, weight=0)
 
         # Add items to the status bar
@@ -33,6 +35,15 @@ class StatusBar(tk.Frame):
         )
         self.workspace_label.grid(row=0, column=0, sticky="w", padx=(5, 5))
 
+        # Right-aligned pattern info label (roulette lobe count)
+        self.pattern_label = tk.Label(
+            self,
+            text="",
+            fg="black",
+            anchor="e"
+        )
+        self.pattern_label.grid(row=0, column=1, sticky="e", padx=(5, 5))
+
         # Right-aligned cursor position label
         self.cursor_label = tk.Label(
             self,
@@ -41,7 +52,7 @@ class StatusBar(tk.Frame):
             anchor="e",
             width=10
         )
-        self.cursor_label.grid(row=0, column=1, sticky="e", padx=(0, 5))
+        self.cursor_label.grid(row=0, column=2, sticky="e", padx=(0, 5))
 
     def create_cursor_mapping(self):
         return {(0, 0): (1, -1, 0, 0),                                          # top-left
@@ -61,6 +72,24 @@ class StatusBar(tk.Frame):
         self.height_mm = workspace_size
         self.pixels_to_mm = self.width_mm / float(self.width_px)
 
+    def update_pattern_info(self, roulette_data):
+        """
+        Show the lobe and turn count of the current roulette.
+
+        Args:
+            roulette_data (dict): Dictionary of roulette parameters, or an empty dict if disabled.
+        """
+        if not roulette_data:
+            self.pattern_label.config(text="")
+            return
+
+        # Memoized lookup; cheap enough to run on every spinbox step.
+        closure = solve_closure(roulette_data['R'], roulette_data['r'], roulette_data['s'])
+        lobes_text = "lobe" if closure.lobes == 1 else "lobes"
+        turns_text = "turn" if closure.turns == 1 else "turns"
+        truncated_text = "+" if closure.truncated else ""
+        self.pattern_label.config(text=f"{closure.lobes} {lobes_text}, {closure.turns}{truncated_text} {turns_text}")
+
     def update_cursor_position(self, event):
         """Update the cursor position label with current mouse coordinates."""
 
@@ -1,6 +1,4 @@
-import numpy as np
-import math
-from fractions import Fraction
+from toolpath import iter_operations, concatenate_toolpaths, MOVE_LINE, MOVE_CUBIC
 
 
 class SVGPostProcessor:
@@ -32,13 +30,18 @@ class SVGPostProcessor:
         self.stroke_width = float(svg_settings['stroke_width'])
         self.include_params = bool(svg_settings['include_params'])
         self.path_resolution = int(svg_settings['path_resolution'])
+        self.fit_curves = bool(svg_settings.get('fit_curves', False))
+        self.fit_tolerance = float(svg_settings.get('fit_tolerance', 0.01))
+
+        # Parameter text is stacked below the workspace, one block per pattern.
+        self.text_pos = self.workspace_height + 2.0
 
     def parse_pattern(self, pattern):
         """
-        TODO: Add a function description here.
+        Parse a roulette or circle array dictionary into SVG elements.
 
         Args:
-            TODO: Add an argument description here.
+            pattern (dict): Dictionary of roulette or circle array parameters (defined in mm).
         """
         if pattern['type'] == 'roulette':
             self.parse_roulette(pattern)
@@ -49,125 +52,134 @@ class SVGPostProcessor:
 
     def parse_circle_array(self, circle_data):
         """
-        Parse a circle array dictionary into SVG <path> and <text> elements.
+        Parse a circle array dictionary into SVG <circle> and <text> elements.
 
         Args:
             circle_data (dict):     Dictionary of circle array parameters (defined in mm).
-                                    example_data = {"type": "circle array", "D": 6.5, "d": 2.5, "n": 6}
                                     example_data = {"type": "circle array", "D": [4.0, 11.0], "d": [5.5, 1.0], "n": [7, 20]}
         """
-        self.pattern_svg = ''
-        self.parameters_svg = ''
-
-        # Extract circle array parameters.
-        ring_diameters = circle_data["D"]
-        circle_diameters = circle_data["d"]
-        num_circles = circle_data["n"]
-
-        text_pos = self.workspace_height + 2.0
-
-        for i in range(0, len(ring_diameters)):
-            angles = np.linspace(0, 2 * np.pi, num_circles[i], endpoint=False)
-            for theta in angles:
-                r = circle_diameters[i] / 2.0
-                cx = (ring_diameters[i] / 2.0) * np.cos(theta)
-                cy = (ring_diameters[i] / 2.0) * np.sin(theta)
-                cx_offset = cx + self.workspace_width / 2.0  # offset to middle of canvas
-                cy_offset = cy + self.workspace_width / 2.0  # offset to middle of canvas
-                self.pattern_svg += (f'\t<circle\n\t\tr="{r}"\n\t\tcx="{cx_offset}"\n\t\tcy="{cy_offset}"'
-                                     f'\n\t\tstroke="{self.stroke_color}"\n\t\tstroke-width="{self.stroke_width}"\n\t\tfill="none" />\n')
-
-            parameters = [('Ring Diameter (D):', f'{float(ring_diameters[i])}{self.workspace_units}'),
-                          ('Circle Diameter (d):', f'{float(circle_diameters[i])}{self.workspace_units}'),
-                          ('# Circles:', num_circles[i])]
-
-            self.parameters_svg += (f'\t<text x="1" y="{text_pos}" font-size="1.25" font-weight="bold">Circle Array {i + 1}</text>\n')
-            text_pos += 1.75  # advance text position by 1.75 units
-
-            for j in range(0, len(parameters)):
-                self.parameters_svg += (f'\t<text x="1" y="{text_pos}" font-size="1.25">\n'
-                                        f'\t\t<tspan>{parameters[j][0]}</tspan>\n'
-                                        f'\t\t<tspan x="15">{parameters[j][1]}</tspan>\n'
-                                        f'\t</text>\n')
-                text_pos += 1.75  # advance text position by 1.75 units
-
-            text_pos += 0.75
+        self.parse_toolpath(self.build_toolpath([circle_data]))
 
     def parse_roulette(self, roulette_data):
         """
         Parse a roulette dictionary into SVG <path> and <text> elements.
+        If curve fitting is enabled, the path uses cubic Bezier (C) segments within the fit tolerance
+        instead of one line (L) segment per point.
 
         Args:
             roulette_data (dict): Dictionary of roulette parameters (defined in mm).
                                   example_data = {"type": "roulette", "R": 6.5, "r": 2.5, "s": 1, "d": 3.5}
         """
-        def compute_point(theta):
-            """Helper function to compute the (x, y) point for a given theta."""
-            factor = (R + s * r)
-            x = factor * np.cos(theta) - s * d * np.cos(theta * factor / r)
-            y = factor * np.sin(theta) - d * np.sin(theta * factor / r)
-            return x, y
-
-        def lcm(a, b):
-            """Helper function to compute the least common multiple of two numbers."""
-            return (a * b) // math.gcd(a, b)
-
-        # Extract roulette parameters.
-        R = Fraction(roulette_data["R"])  # define as fraction
-        r = Fraction(roulette_data["r"])  # define as fraction
-        s = roulette_data["s"]
-        d = roulette_data["d"]
-
-        # Compute the effective radius.
-        effective_R = R + s * r
-
-        # Compute the GCD of the numerators and the LCM of the denominators.
-        numerator_gcd = math.gcd(r.numerator, effective_R.numerator)
-        denominator_lcm = lcm(r.denominator, effective_R.denominator)
-
-        # Simplify as a fraction.
-        gcd_fraction = Fraction(numerator_gcd, denominator_lcm)
-
-        # Calculate the number of turns needed to close the path.
-        n_turns = r / gcd_fraction
-        total_angle = n_turns * 2 * np.pi
-        thetas = np.linspace(0, total_angle, self.path_resolution, endpoint=False)
-
-        # Create a new path command string and move to the starting point.
-        path_commands = ""
-        start_x, start_y = compute_point(thetas[0])
-        start_x_offset = start_x + self.workspace_width / 2.0  # offset to middle of canvas
-        start_y_offset = start_y + self.workspace_height / 2.0  # offset to middle of canvas
-        path_commands += f"\t\t\tM {start_x_offset} {start_y_offset}\n"  # move to (absolute)
-
-        # Make line segments between successive XY locations.
-        for theta in thetas[1:]:
-            next_x, next_y = compute_point(theta)
-            next_x_offset = next_x + self.workspace_width / 2.0  # offset to middle of canvas
-            next_y_offset = next_y + self.workspace_height / 2.0  # offset to middle of canvas
-            path_commands += f"\t\t\tL {next_x_offset} {next_y_offset}\n"  # line to (absolute)
-
-        # Close the pattern by moving back to the start.
-        path_commands += "\t\t\tZ\n"
-
-        # Set the pattern and parameter attributes.
-        self.pattern_svg = (f'\t<path\n\t\td="{path_commands.strip()}"\n\t\tstroke="{self.stroke_color}"'
-                            f'\n\t\tstroke-width="{self.stroke_width}"\n\t\tfill="none" />\n')
-
-        parameters = [('Fixed Circle Radius (R):', f'{float(R)}{self.workspace_units}'),
-                      ('Rolling Circle Radius (r):', f'{float(r)}{self.workspace_units}'),
-                      ('Rolling Side (s):', 'Inside' if s == -1 else 'Outside'),
-                      ('Pen Distance (d):', f'{float(d)}{self.workspace_units}')]
-
-        text_pos = self.workspace_height + 2.0
-        self.parameters_svg = (f'\t<text x="1" y="{text_pos}" font-size="1.25" font-weight="bold">Roulette</text>\n')
-        text_pos += 1.75  # advance text position by 1.75 units
-        for i in range(0, len(parameters)):
-            self.parameters_svg += (f'\t<text x="1" y="{text_pos}" font-size="1.25">\n'
-                                    f'\t\t<tspan>{parameters[i][0]}</tspan>\n'
-                                    f'\t\t<tspan x="15">{parameters[i][1]}</tspan>\n'
+        self.parse_toolpath(self.build_toolpath([roulette_data]))
+
+    def build_toolpath(self, patterns):
+        """
+        Build the toolpath for a set of patterns with the path resolution and curve fitting settings.
+        Pattern dimensions are drawn as-is in workspace units, so no unit conversion is applied.
+
+        Args:
+            patterns (list): Pattern dictionaries.
+
+        Returns:
+            Toolpath: The contours of all patterns (single pass).
+        """
+        return concatenate_toolpaths(list(self.iter_operations(patterns)))
+
+    def iter_operations(self, patterns):
+        """
+        Build the toolpath for a set of patterns one operation at a time, as build_toolpath() does.
+
+        Args:
+            patterns (list): Pattern dictionaries.
+
+        Yields:
+            Toolpath: The contour of one operation (single pass).
+        """
+        toolpath_data = {"cut_res": self.path_resolution,
+                         "roulette_moves": "spline" if self.fit_curves else "linear",
+                         "fit_tol": self.fit_tolerance}
+        return iter_operations(patterns, toolpath_data)
+
+    def parse_toolpath(self, toolpath):
+        """
+        Append the first pass of every operation in a toolpath as SVG elements, together with the
+        pattern parameter text.
+
+        Args:
+            toolpath (Toolpath): Moves and operations from toolpath.build_toolpath().
+        """
+        # Offset the moves to the middle of the canvas.
+        xs = (toolpath.x + self.workspace_width / 2.0).tolist()
+        ys = (toolpath.y + self.workspace_height / 2.0).tolist()
+
+        for op_index, operation in enumerate(toolpath.operations):
+            start_x, start_y, cut = toolpath.contour(op_index)
+
+            if operation["type"] == "circle":
+                # Full circle: the center is given relative to the start point.
+                n = cut.start
+                cx_offset = xs[n] + float(toolpath.i[n])
+                cy_offset = ys[n] + float(toolpath.j[n])
+                self.pattern_svg += (f'\t<circle\n\t\tr="{operation["radius"]}"\n\t\tcx="{cx_offset}"\n\t\tcy="{cy_offset}"'
+                                     f'\n\t\tstroke="{self.stroke_color}"\n\t\tstroke-width="{self.stroke_width}"\n\t\tfill="none" />\n')
+
+                if operation["first_in_ring"]:
+                    self._add_parameters(f'Circle Array {operation["ring"] + 1}',
+                                         [('Ring Diameter (D):', f'{float(operation["D"])}{self.workspace_units}'),
+                                          ('Circle Diameter (d):', f'{float(operation["d"])}{self.workspace_units}'),
+                                          ('# Circles:', operation["count"])])
+                    self.text_pos += 0.75
+
+            elif operation["type"] == "roulette":
+                # Move to the starting point.
+                path_commands = (f"\t\t\tM {start_x + self.workspace_width / 2.0} "
+                                 f"{start_y + self.workspace_height / 2.0}\n")  # move to (absolute)
+
+                # The closing segment back to the start is drawn by Z.
+                stop = cut.stop
+                if toolpath.kind[stop - 1] == MOVE_LINE and (toolpath.x[stop - 1], toolpath.y[stop - 1]) == (start_x, start_y):
+                    stop -= 1
+
+                kinds = toolpath.kind[cut.start:stop].tolist()
+                for n, kind in enumerate(kinds, start=cut.start):
+                    if kind == MOVE_CUBIC:
+                        # First control point is relative to the start point; second is relative to the end point.
+                        path_commands += (f"\t\t\tC {xs[n - 1] + toolpath.i[n]} {ys[n - 1] + toolpath.j[n]} "
+                                          f"{xs[n] + toolpath.p[n]} {ys[n] + toolpath.q[n]} "
+                                          f"{xs[n]} {ys[n]}\n")  # cubic curve to (absolute)
+                    else:
+                        path_commands += f"\t\t\tL {xs[n]} {ys[n]}\n"  # line to (absolute)
+
+                # Close the pattern by moving back to the start.
+                path_commands += "\t\t\tZ\n"
+
+                self.pattern_svg += (f'\t<path\n\t\td="{path_commands.strip()}"\n\t\tstroke="{self.stroke_color}"'
+                                     f'\n\t\tstroke-width="{self.stroke_width}"\n\t\tfill="none" />\n')
+
+                R, r, s, d = operation["R"], operation["r"], operation["s"], operation["d"]
+                self._add_parameters('Roulette',
+                                     [('Fixed Circle Radius (R):', f'{float(R)}{self.workspace_units}'),
+                                      ('Rolling Circle Radius (r):', f'{float(r)}{self.workspace_units}'),
+                                      ('Rolling Side (s):', 'Inside' if s == -1 else 'Outside'),
+                                      ('Pen Distance (d):', f'{float(d)}{self.workspace_units}')])
+
+    def _add_parameters(self, title, parameters):
+        """
+        Append a bold title and one <text> row per (label, value) pair to the parameter text.
+
+        Args:
+            title (str): Heading for the parameter block.
+            parameters (list): List of (label, value) tuples.
+        """
+        self.parameters_svg += (f'\t<text x="1" y="{self.text_pos}" font-size="1.25" font-weight="bold">{title}</text>\n')
+        self.text_pos += 1.75  # advance text position by 1.75 units
+
+        for label, value in parameters:
+            self.parameters_svg += (f'\t<text x="1" y="{self.text_pos}" font-size="1.25">\n'
+                                    f'\t\t<tspan>{label}</tspan>\n'
+                                    f'\t\t<tspan x="15">{value}</tspan>\n'
                                     f'\t</text>\n')
-            text_pos += 1.75  # advance text position by 1.75 units
+            self.text_pos += 1.75  # advance text position by 1.75 units
 
     def save_to_file(self, filename):
         """
@@ -0,0 +1,594 @@
+import numpy as np
+from functools import partial
+from roulette_geometry import compute_roulette, compute_roulette_adaptive, estimate_roulette_cost, MAX_TURNS
+from path_fitting import fit_arcs, fit_cubic_beziers, SEGMENT_LINE, SEGMENT_ARC_CW, SEGMENT_ARC_CCW, SEGMENT_CUBIC
+from travel_optimizer import optimize_travel
+
+
+# Move kinds. Each kind implies which words a writer emits for it:
+#   MOVE_RETRACT  - Z only, to safe Z at the jog feedrate.
+#   MOVE_RAPID    - X and Y, to the start of a contour at the jog feedrate.
+#   MOVE_PLUNGE   - Z only, to cutting depth (or to the stock surface for helical passes) at the Z feedrate.
+#   MOVE_LINE     - X and Y, straight cut.
+#   MOVE_ARC_*    - X and Y with center offsets (I, J) relative to the move start.
+#   MOVE_CIRCLE_* - Full circle ending at its start point; center offsets (I, J) only.
+#   MOVE_CUBIC    - X and Y with control point offsets (I, J) from the move start and (P, Q) from the move end.
+# Cut moves of helical passes ramp down in Z, so writers also emit Z for them.
+MOVE_RETRACT = 0
+MOVE_RAPID = 1
+MOVE_PLUNGE = 2
+MOVE_LINE = 3
+MOVE_ARC_CW = 4
+MOVE_ARC_CCW = 5
+MOVE_CIRCLE_CW = 6
+MOVE_CIRCLE_CCW = 7
+MOVE_CUBIC = 8
+
+CUT_MOVES = (MOVE_LINE, MOVE_ARC_CW, MOVE_ARC_CCW, MOVE_CIRCLE_CW, MOVE_CIRCLE_CCW, MOVE_CUBIC)
+
+# Smallest radius (in mm) of arcs fitted to roulettes. Arcs stay well above the 0.001 output resolution, where
+# rounding their end points would move the center by a large fraction of the radius.
+MIN_ARC_RADIUS = 0.01
+
+# Fitted segment kinds mapped to move kinds.
+_SEGMENT_MOVES = {SEGMENT_LINE: MOVE_LINE, SEGMENT_ARC_CW: MOVE_ARC_CW,
+                  SEGMENT_ARC_CCW: MOVE_ARC_CCW, SEGMENT_CUBIC: MOVE_CUBIC}
+
+# Number of feed steps between the floor and the ceiling of a curvature-based feed schedule.
+FEED_LEVELS = 8
+
+# Column names and types of the structure-of-arrays representation.
+COLUMNS = (("kind", np.uint8), ("x", np.float64), ("y", np.float64), ("z", np.float64),
+           ("feed", np.float64), ("i", np.float64), ("j", np.float64), ("p", np.float64),
+           ("q", np.float64), ("op", np.int32), ("pass_number", np.int16))
+
+
+class Toolpath:
+    def __init__(self, columns, operations, units="metric"):
+        """
+        Toolpath intermediate representation shared by the G code writer, the SVG writer and the preview.
+
+        Every move is one row across typed column arrays. Positions (x, y, z) are absolute and
+        pattern-centered; writers apply their own origin offset. Unused offset words are NaN.
+
+        Args:
+            columns (dict): Column arrays keyed by the names in COLUMNS.
+            operations (list): One dictionary per operation (one closed contour), holding the
+                               operation type, its pattern parameters and the [start, stop) move
+                               range of each pass under the key "passes".
+            units (str): Either 'imperial' or 'metric'. All coordinates, depths and feeds share these units.
+        """
+        for name, dtype in COLUMNS:
+            setattr(self, name, np.ascontiguousarray(columns[name], dtype=dtype))
+        self.operations = operations
+        self.units = units
+
+    def __len__(self):
+        return len(self.kind)
+
+    @property
+    def nbytes(self):
+        """
+        Return the memory used by the move columns in bytes.
+        """
+        return sum(getattr(self, name).nbytes for name, _ in COLUMNS)
+
+    def move_lengths(self):
+        """
+        Return the path length of every move, including its Z travel. Moves that start from an unknown
+        position (before the first contour) have length 0.
+
+        Returns:
+            tuple: Arrays (xy, total) of XY path lengths and 3D path lengths.
+        """
+        x0, y0, z0 = (np.concatenate(([np.nan], column[:-1])) for column in (self.x, self.y, self.z))
+        moves = {name: getattr(self, name) for name in ("x", "y", "i", "j", "p", "q")}
+        xy = np.nan_to_num(_xy_lengths(self.kind, x0, y0, moves))
+        return xy, np.hypot(xy, np.nan_to_num(self.z - z0))
+
+    def contour(self, op_index, pass_index=0):
+        """
+        Return the start point and cut moves of one pass of an operation.
+
+        Args:
+            op_index (int): Index into self.operations.
+            pass_index (int): Zero-based pass index.
+
+        Returns:
+            tuple: (start_x, start_y, cut) where cut is the slice of cut moves in the move columns.
+        """
+        start, stop = self.operations[op_index]["passes"][pass_index]
+        if not np.any(self.kind[start:stop] == MOVE_RAPID):
+            # Later helical laps have no lead-in; a closed contour ends where it starts.
+            return float(self.x[stop - 1]), float(self.y[stop - 1]), slice(start, stop)
+        rapid = start + int(np.argmax(self.kind[start:stop] == MOVE_RAPID))
+        first_cut = rapid + 2  # rapid XY, then plunge
+        return float(self.x[rapid]), float(self.y[rapid]), slice(first_cut, stop)
+
+
+def _move_block(kind, x, y, i=None, j=None, p=None, q=None):
+    """
+    Collect the XY part of a run of moves into column arrays.
+    """
+    n = len(kind)
+    nan = np.full(n, np.nan)
+    return {"kind": np.asarray(kind, dtype=np.uint8), "x": np.asarray(x, dtype=float), "y": np.asarray(y, dtype=float),
+            "i": nan if i is None else np.asarray(i, dtype=float), "j": nan if j is None else np.asarray(j, dtype=float),
+            "p": nan if p is None else np.asarray(p, dtype=float), "q": nan if q is None else np.asarray(q, dtype=float)}
+
+
+def _roulette_moves(R, r, s, d, settings, strict):
+    """
+    Sample (and optionally fit) a roulette into a closed run of cut moves.
+
+    Returns:
+        tuple: (start_x, start_y, cut moves, operation metadata).
+    """
+    # Helical passes trace the curve once more, for the final flat lap.
+    num_laps = settings["num_passes"] + (1 if settings["pass_strategy"] == "helical" else 0)
+    if settings["adaptive"]:
+        xs, ys = compute_roulette_adaptive(R, r, s, d, settings["chord_tol"], max_turns=settings["max_turns"],
+                                           strict=strict)
+        cost = estimate_roulette_cost(R, r, s, len(xs), num_passes=num_laps, max_turns=settings["max_turns"],
+                                      strict=strict)
+    else:
+        # Refuse paths that do not close or are too coarsely sampled before generating the full geometry.
+        cost = estimate_roulette_cost(R, r, s, settings["cut_res"], num_passes=num_laps,
+                                      max_turns=settings["max_turns"], strict=strict)
+        xs, ys = compute_roulette(R, r, s, d, settings["cut_res"], max_turns=settings["max_turns"])
+
+    metadata = {"type": "roulette", "R": R, "r": r, "s": s, "d": d, "cost": cost, "fit": None,
+                "feed_schedule": None}
+    if settings["adaptive"]:
+        metadata["resolution"] = ("tol", settings["chord_tol"])
+    else:
+        metadata["resolution"] = ("res", settings["cut_res"])
+
+    roulette_moves = settings["roulette_moves"]
+    if roulette_moves in ('arc', 'spline'):
+        fit_tol = settings["fit_tol"]
+        if fit_tol <= 0:
+            raise ValueError("Curve fitting tolerance must be a positive value.")
+        if roulette_moves == 'arc':
+            segments = fit_arcs(xs, ys, fit_tol, min_radius=settings["min_arc_radius"])
+        else:
+            segments = fit_cubic_beziers(xs, ys, fit_tol)
+
+        end_x, end_y = segments["x"], segments["y"]
+        start_x = np.concatenate(([xs[0]], end_x[:-1]))
+        start_y = np.concatenate(([ys[0]], end_y[:-1]))
+        kind = np.vectorize(_SEGMENT_MOVES.get, otypes=[np.uint8])(segments["kind"])
+
+        # Offsets follow the G code conventions: arc centers and the first control point are relative
+        # to the move start, the second control point is relative to the move end.
+        if roulette_moves == 'arc':
+            moves = _move_block(kind, end_x, end_y, i=segments["cx"] - start_x, j=segments["cy"] - start_y)
+        else:
+            moves = _move_block(kind, end_x, end_y, i=segments["c1x"] - start_x, j=segments["c1y"] - start_y,
+                                p=segments["c2x"] - end_x, q=segments["c2y"] - end_y)
+
+        n_curves = int(np.sum(segments["kind"] != SEGMENT_LINE))
+        metadata["fit"] = {"moves": len(kind), "curves": n_curves,
+                           "curve_type": "arcs" if roulette_moves == 'arc' else "splines", "tol": fit_tol}
+    else:
+        # Move to each successive point and close the pattern by moving back to the starting point.
+        n = len(xs)
+        moves = _move_block(np.full(n, MOVE_LINE), np.append(xs[1:], xs[0]), np.append(ys[1:], ys[0]))
+
+    if settings["feed_schedule"] == "curvature":
+        moves["feed"] = _curvature_feeds(xs, ys, moves, settings)
+        metadata["feed_schedule"] = {"floor": settings["feed_floor"], "ceiling": settings["feed_ceiling"],
+                                     "min": float(np.min(moves["feed"])), "max": float(np.max(moves["feed"]))}
+
+    return float(xs[0]), float(ys[0]), moves, metadata
+
+
+def _curvature_feeds(xs, ys, moves, settings):
+    """
+    Schedule a feedrate for each cut move of a closed sampled curve from the curvature of the curve.
+
+    The feed at each sample is the speed at which the centripetal acceleration reaches the XY acceleration
+    limit, clipped between the feed floor and ceiling (cusps get the floor). It is then smoothed: the feed
+    ramps down ahead of tight spots and back up after them at the same acceleration, and is rounded down
+    to one of FEED_LEVELS steps so that the feed only changes where it matters. Each move gets the lowest
+    feed of the samples along it.
+
+    Args:
+        xs, ys (np.ndarray): Sample points of the curve (the last point connects back to the first).
+        moves (dict): Cut move columns from _move_block() (lines, or fitted arcs and cubics).
+        settings (dict): Toolpath settings from _toolpath_settings().
+
+    Returns:
+        np.ndarray: Feedrate of each move.
+    """
+    floor, ceiling, accel = settings["feed_floor"], settings["feed_ceiling"], settings["accel_xy"]
+    if not 0 < floor <= ceiling:
+        raise ValueError("Feed floor must be positive and not above the feed ceiling.")
+    if accel <= 0:
+        raise ValueError("Curvature-based feeds need a positive XY acceleration.")
+
+    # Curvature at each sample from the circle through it and its neighbours: 2 sin(turn) / chord.
+    before_x, before_y = xs - np.roll(xs, 1), ys - np.roll(ys, 1)
+    after_x, after_y = np.roll(xs, -1) - xs, np.roll(ys, -1) - ys
+    chord = np.hypot(before_x + after_x, before_y + after_y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        curvature = 2 * np.abs(before_x * after_y - before_y * after_x) / (
+            np.hypot(before_x, before_y) * np.hypot(after_x, after_y) * chord)
+        feed = 60.0 * np.sqrt(accel / curvature)  # units/min
+    feed = np.clip(np.nan_to_num(feed, nan=floor), floor, ceiling)
+
+    # Limit the change in feed between samples to what the acceleration allows, in both directions. The
+    # curve is closed, so the passes run over two laps and keep the second.
+    spacing = np.hypot(after_x, after_y)
+    speed_sq = np.tile((feed / 60.0) ** 2, 2)
+    reach = np.concatenate(([0.0], np.cumsum(2 * accel * np.tile(spacing, 2))))[:-1]
+    speed_sq = np.minimum(speed_sq, reach + np.minimum.accumulate(speed_sq - reach))
+    speed_sq = np.minimum(speed_sq, np.minimum.accumulate((speed_sq + reach)[::-1])[::-1] - reach)
+    speed_sq = np.minimum(speed_sq[:len(xs)], speed_sq[len(xs):])
+    feed = 60.0 * np.sqrt(speed_sq)
+
+    # Round down to a few feed levels.
+    step = (ceiling - floor) / FEED_LEVELS
+    if step > 0:
+        feed = floor + step * np.floor((feed - floor) / step + 1e-9)
+    feed = np.clip(feed, floor, ceiling)
+
+    # Each move spans the samples from the last one at or before its start to the first one at or after
+    # its end, matched by distance along the curve.
+    samples = np.concatenate(([0.0], np.cumsum(spacing)))
+    x0 = np.concatenate(([xs[0]], moves["x"][:-1]))
+    y0 = np.concatenate(([ys[0]], moves["y"][:-1]))
+    distance = np.cumsum(_xy_lengths(moves["kind"], x0, y0, moves))
+    distance *= samples[-1] / distance[-1]
+    start = np.searchsorted(samples, np.concatenate(([0.0], distance[:-1])), side="right") - 1
+    stop = np.minimum(np.searchsorted(samples, distance, side="left"), len(xs)) + 1
+    closed = np.concatenate((feed, [feed[0], np.inf]))
+    return np.minimum.reduceat(closed, np.column_stack((start, stop)).ravel())[::2]
+
+
+def _circle_array_moves(D, d, n):
+    """
+    Yield each circle of a circle array as a full-circle cut move.
+
+    Yields:
+        tuple: (start_x, start_y, cut moves, operation metadata).
+    """
+    for i in range(0, len(D)):
+        angles = np.linspace(0, 2 * np.pi, n[i], endpoint=False)
+        for j in range(0, len(angles)):
+            R = D[i] / 2.0
+            r = d[i] / 2.0
+
+            # Start and end at the point nearest to the center of the pattern, circling clockwise
+            # around a center given relative to the start point.
+            start_x = (R - r) * np.cos(angles[j])
+            start_y = (R - r) * np.sin(angles[j])
+            moves = _move_block([MOVE_CIRCLE_CW], [start_x], [start_y],
+                                i=[r * np.cos(angles[j])], j=[r * np.sin(angles[j])])
+
+            metadata = {"type": "circle", "ring": i, "index": j, "count": n[i], "D": D[i], "d": d[i], "radius": r}
+            yield float(start_x), float(start_y), moves, metadata
+
+
+def _xy_lengths(kind, x0, y0, moves, cubic_samples=16):
+    """
+    Return the XY path length of each move.
+
+    Args:
+        kind (np.ndarray): Move kinds.
+        x0, y0 (np.ndarray): Start point of each move.
+        moves (dict): Move columns x, y, i, j, p and q.
+        cubic_samples (int): Number of chords measured along each cubic.
+
+    Returns:
+        np.ndarray: Path lengths.
+    """
+    x, y, i, j = moves["x"], moves["y"], moves["i"], moves["j"]
+    lengths = np.hypot(x - x0, y - y0)
+
+    # Arcs are measured along the arc, from the angle swept around their center.
+    arcs = (kind == MOVE_ARC_CW) | (kind == MOVE_ARC_CCW)
+    if np.any(arcs):
+        cx, cy = x0[arcs] + i[arcs], y0[arcs] + j[arcs]
+        start_angle = np.arctan2(y0[arcs] - cy, x0[arcs] - cx)
+        end_angle = np.arctan2(y[arcs] - cy, x[arcs] - cx)
+        sweep = np.where(kind[arcs] == MOVE_ARC_CCW, end_angle - start_angle, start_angle - end_angle) % (2 * np.pi)
+        lengths[arcs] = np.hypot(i[arcs], j[arcs]) * sweep
+
+    circles = (kind == MOVE_CIRCLE_CW) | (kind == MOVE_CIRCLE_CCW)
+    lengths[circles] = 2 * np.pi * np.hypot(i[circles], j[circles])
+
+    # Cubics are measured along a polyline through points of the curve.
+    cubics = kind == MOVE_CUBIC
+    if np.any(cubics):
+        t = np.linspace(0, 1, cubic_samples + 1)[:, None]
+        points = []
+        for start, end, start_offset, end_offset in ((x0, x, i, moves["p"]), (y0, y, j, moves["q"])):
+            a, d = start[cubics], end[cubics]
+            b, c = a + start_offset[cubics], d + end_offset[cubics]
+            points.append((1 - t) ** 3 * a + 3 * (1 - t) ** 2 * t * b + 3 * (1 - t) * t ** 2 * c + t ** 3 * d)
+        lengths[cubics] = np.sum(np.hypot(np.diff(points[0], axis=0), np.diff(points[1], axis=0)), axis=0)
+
+    return lengths
+
+
+def _ramp_fraction(start_x, start_y, moves):
+    """
+    Return the fraction of the XY path length of a closed contour covered at the end of each cut move.
+
+    Args:
+        start_x, start_y (float): Start point of the contour.
+        moves (dict): Cut move columns (lines, arcs or circles) from _move_block().
+
+    Returns:
+        np.ndarray: Increasing fractions, the last one exactly 1.
+    """
+    x0 = np.concatenate(([start_x], moves["x"][:-1]))
+    y0 = np.concatenate(([start_y], moves["y"][:-1]))
+    travelled = np.cumsum(_xy_lengths(moves["kind"], x0, y0, moves))
+    return travelled / travelled[-1]
+
+
+def _toolpath_settings(toolpath_data):
+    """
+    Extract toolpath parameters (already in correct units), filling in defaults for missing keys.
+    """
+    return {"safe_z": float(toolpath_data.get('safe_z', 0)),
+            "jog_feed_xyz": float(toolpath_data.get('jog_feed_xyz', 0)),
+            "cut_feed_xy": float(toolpath_data.get('cut_feed_xy', 0)),
+            "cut_feed_z": float(toolpath_data.get('cut_feed_z', 0)),
+            "depth_per_pass": float(toolpath_data.get('depth_per_pass', 0)),
+            "num_passes": int(toolpath_data.get('num_passes', 1)),
+            "pass_strategy": toolpath_data.get('pass_strategy', 'layered'),
+            "optimize_travel": bool(toolpath_data.get('optimize_travel', False)),
+            "feed_schedule": toolpath_data.get('feed_schedule', 'constant'),
+            "feed_floor": float(toolpath_data.get('feed_floor', 0)),
+            "feed_ceiling": float(toolpath_data.get('feed_ceiling', 0)),
+            "accel_xy": float(toolpath_data.get('accel_xy', 0)),
+            "cut_res": int(toolpath_data.get('cut_res', 0)),
+            "adaptive": toolpath_data.get('sampling', 'uniform') == 'adaptive',
+            "chord_tol": float(toolpath_data.get('chord_tol', 0)),
+            "roulette_moves": toolpath_data.get('roulette_moves', 'linear'),
+            "fit_tol": float(toolpath_data.get('fit_tol', 0)),
+            "max_turns": int(toolpath_data.get('max_turns', MAX_TURNS))}
+
+
+def iter_operations(patterns, toolpath_data, units="metric", strict=True, split_passes=False):
+    """
+    Build the toolpath for a set of patterns one operation at a time. Each operation (one closed
+    contour) is only evaluated when it is requested, so a consumer that writes and discards each
+    operation holds the geometry of a single contour at any time. With split_passes, each cut pass
+    is yielded separately, so only one pass of one contour is held at any time.
+
+    Args:
+        patterns (list): Pattern dictionaries, as for build_toolpath().
+        toolpath_data (dict): Dictionary of machining parameters, as for build_toolpath().
+        units (str): Either 'imperial' or 'metric'. Pattern dimensions are converted to these units.
+        strict (bool): If True, refuse roulettes that do not close or are too coarsely sampled.
+                       If False, truncate them instead (for display).
+        split_passes (bool): If True, yield one toolpath per cut pass instead of one per operation.
+
+    Yields:
+        Toolpath: The moves of one operation (or pass). The op column holds its index in the whole pattern set.
+    """
+    # Pattern dimensions are defined in mm. Convert to inches if units not metric.
+    scale = 1.0 if units == "metric" else 1.0 / 25.4
+    settings = _toolpath_settings(toolpath_data)
+    settings["min_arc_radius"] = MIN_ARC_RADIUS * scale
+
+    # Describe the contours of every pattern by where they can be entered: a roulette at its start point,
+    # a circle anywhere on its circumference (given as its center and radius). Roulettes are only
+    # evaluated when they are cut.
+    def contour_sites():
+        for pattern in patterns:
+            if not pattern:
+                continue
+            if pattern.get("type") == "roulette":
+                R, r, s, d = pattern["R"] * scale, pattern["r"] * scale, pattern["s"], pattern["d"] * scale
+                start_x = R + s * r - s * d  # the curve at a rolling angle of 0
+                yield (start_x, 0.0), (start_x, 0.0), 0.0, partial(_roulette_moves, R, r, s, d, settings, strict)
+            elif pattern.get("type") == "circle array":
+                for contour in _circle_array_moves([x * scale for x in pattern["D"]],
+                                                   [x * scale for x in pattern["d"]], pattern["n"]):
+                    start_x, start_y, moves, metadata = contour
+                    center = (start_x + float(moves["i"][0]), start_y + float(moves["j"][0]))
+                    yield (start_x, start_y), center, metadata["radius"], lambda contour=contour: contour
+            else:
+                raise ValueError("Pattern must be a valid roulette or circle array dictionary.")
+
+    def contours():
+        if not settings["optimize_travel"]:
+            for _, _, _, build in contour_sites():
+                yield build()
+            return
+
+        # Reorder the contours and move the entry point of each circle to shorten the rapid travel between them.
+        sites = list(contour_sites())
+        if not sites:
+            return
+        order, entries, before, after = optimize_travel([site[0] for site in sites], [site[1] for site in sites],
+                                                        [site[2] for site in sites])
+        for n, index in enumerate(order.tolist()):
+            _, (center_x, center_y), radius, build = sites[index]
+            start_x, start_y, moves, metadata = build()
+            if radius > 0:
+                start_x, start_y = float(entries[index, 0]), float(entries[index, 1])
+                moves = dict(moves, x=np.array([start_x]), y=np.array([start_y]),
+                             i=np.array([center_x - start_x]), j=np.array([center_y - start_y]))
+            if n == 0 and len(sites) > 1:
+                metadata["travel"] = {"before": before, "after": after}
+            yield start_x, start_y, moves, metadata
+
+    # Lay out the passes of each contour. The retract move keeps the XY position where the
+    # previous contour ended (unknown before the first one).
+    num_passes = settings["num_passes"]
+    if settings["pass_strategy"] not in ("layered", "helical"):
+        raise ValueError("Pass strategy must be 'layered' or 'helical'.")
+    if settings["feed_schedule"] not in ("constant", "curvature"):
+        raise ValueError("Feed schedule must be 'constant' or 'curvature'.")
+    helical = settings["pass_strategy"] == "helical"
+    last_x, last_y = np.nan, np.nan
+    rings_started = set()
+    for op_index, (start_x, start_y, moves, metadata) in enumerate(contours()):
+        if metadata["type"] == "circle":
+            # Contours may be cut out of ring order; mark where each ring is first cut.
+            metadata["first_in_ring"] = metadata["ring"] not in rings_started
+            rings_started.add(metadata["ring"])
+        metadata["num_passes"] = num_passes
+        metadata["pass_strategy"] = settings["pass_strategy"]
+        metadata["passes"] = []
+        n_cut = len(moves["kind"])
+        blocks = []
+        count = 0
+
+        if helical:
+            if np.any(moves["kind"] == MOVE_CUBIC):
+                raise ValueError("Helical passes need line or arc moves; spline moves cannot ramp in Z.")
+            ramp = _ramp_fraction(start_x, start_y, moves)
+
+        # Helical passes add a final flat lap at full depth.
+        for p in range(1, num_passes + (2 if helical else 1)):
+            depth = -p * settings["depth_per_pass"]
+            pass_blocks = []
+
+            # Jog to starting XY at safe Z height, then plunge into material. Helical passes only plunge
+            # to the stock surface, once, and then ramp down one depth step per lap along the path.
+            if p == 1 or not helical:
+                lead_in = _move_block([MOVE_RETRACT, MOVE_RAPID, MOVE_PLUNGE], [last_x, start_x, start_x],
+                                      [last_y, start_y, start_y])
+                lead_in["z"] = np.array([settings["safe_z"], settings["safe_z"], 0.0 if helical else depth])
+                lead_in["feed"] = np.array([settings["jog_feed_xyz"], settings["jog_feed_xyz"],
+                                            settings["cut_feed_z"]])
+                pass_blocks.append(lead_in)
+
+            cut = dict(moves)
+            if helical:
+                cut["z"] = -np.minimum(p - 1 + ramp, num_passes) * settings["depth_per_pass"]
+            else:
+                cut["z"] = np.full(n_cut, depth)
+            cut["feed"] = moves["feed"] if "feed" in moves else np.full(n_cut, settings["cut_feed_xy"])
+            pass_blocks.append(cut)
+
+            for block in pass_blocks:
+                block["op"] = np.full(len(block["kind"]), op_index)
+                block["pass_number"] = np.full(len(block["kind"]), p)
+            last_x, last_y = float(cut["x"][-1]), float(cut["y"][-1])
+            n_pass = sum(len(block["kind"]) for block in pass_blocks)
+
+            if split_passes:
+                columns = {name: np.concatenate([block[name] for block in pass_blocks]) for name, _ in COLUMNS}
+                yield Toolpath(columns, [dict(metadata, passes=[(0, n_pass)])], units)
+            else:
+                blocks.extend(pass_blocks)
+                metadata["passes"].append((count, count + n_pass))
+                count += n_pass
+
+        if not split_passes:
+            columns = {name: np.concatenate([block[name] for block in blocks]) for name, _ in COLUMNS}
+            yield Toolpath(columns, [metadata], units)
+
+
+def count_operations(patterns):
+    """
+    Count the operations (closed contours) of a set of patterns without evaluating their geometry.
+
+    Args:
+        patterns (list): Pattern dictionaries, as for build_toolpath().
+
+    Returns:
+        int: Number of operations iter_operations() yields for the patterns.
+    """
+    count = 0
+    for pattern in patterns:
+        if pattern and pattern.get("type") == "roulette":
+            count += 1
+        elif pattern and pattern.get("type") == "circle array":
+            count += sum(int(n) for n in pattern["n"])
+    return count
+
+
+def concatenate_toolpaths(toolpaths, units="metric"):
+    """
+    Join toolpaths (for example the operations from iter_operations()) into one.
+
+    Args:
+        toolpaths (list): Toolpath objects, all in the same units.
+        units (str): Units of the result if the list is empty.
+
+    Returns:
+        Toolpath: All moves and operations, in order.
+    """
+    operations = []
+    count = 0
+    for toolpath in toolpaths:
+        for operation in toolpath.operations:
+            operation = dict(operation)
+            operation["passes"] = [(start + count, stop + count) for start, stop in operation["passes"]]
+            operations.append(operation)
+        count += len(toolpath)
+        units = toolpath.units
+
+    if toolpaths:
+        columns = {name: np.concatenate([getattr(toolpath, name) for toolpath in toolpaths]) for name, _ in COLUMNS}
+    else:
+        columns = {name: np.empty(0) for name, _ in COLUMNS}
+
+    return Toolpath(columns, operations, units)
+
+
+def build_toolpath(patterns, toolpath_data, units="metric", strict=True):
+    """
+    Build the toolpath for a set of patterns: one operation per closed contour, each cut in
+    one or more passes (retract to safe Z, rapid to the start, plunge, cut). With the helical pass
+    strategy, the contour is instead cut in one continuous ramp of num_passes laps and a final flat lap.
+
+    The geometry is evaluated once here; G code, SVG and preview output are all written from the result.
+
+    Args:
+        patterns (list): Pattern dictionaries (defined in mm) from CircleSettings.get_circle_array_data()
+                         and RouletteSettings.get_roulette_data(). Empty dictionaries are skipped.
+        toolpath_data (dict): Dictionary of machining parameters (defined in mm or in). Missing keys
+                              default to a single pass at zero depth, which is enough for drawing.
+                              example_data = {"safe_z": 0.25,
+                                              "jog_feed_xyz": 8.0,
+                                              "cut_feed_xy": 2.0,
+                                              "cut_feed_z": 1.0,
+                                              "depth_per_pass": 0.02,
+                                              "num_passes": 1,
+                                              "pass_strategy": "layered",
+                                              "optimize_travel": False,
+                                              "feed_schedule": "constant",
+                                              "feed_floor": 2.0,
+                                              "feed_ceiling": 8.0,
+                                              "accel_xy": 4.0,
+                                              "cut_res": 200,
+                                              "sampling": "uniform",
+                                              "chord_tol": 0.0005,
+                                              "roulette_moves": "linear",
+                                              "fit_tol": 0.0005}
+        units (str): Either 'imperial' or 'metric'. Pattern dimensions are converted to these units.
+        strict (bool): If True, refuse roulettes that do not close or are too coarsely sampled.
+                       If False, truncate them instead (for display).
+
+    Returns:
+        Toolpath: The moves of all patterns.
+    """
+    return concatenate_toolpaths(list(iter_operations(patterns, toolpath_data, units, strict)), units)
+
+
+# Example usage
+if __name__ == "__main__":
+    example_toolpath = {"safe_z": 0.25, "jog_feed_xyz": 8.0, "cut_feed_xy": 2.0, "cut_feed_z": 1.0,
+                        "depth_per_pass": 0.02, "num_passes": 3, "cut_res": 2000}
+    example_patterns = [{"type": "circle array", "D": [4.0, 11.0], "d": [5.5, 1.0], "n": [7, 20]},
+                        {"type": "roulette", "R": 5.0, "r": 2.0, "s": -1, "d": 2.0}]
+
+    toolpath = build_toolpath(example_patterns, example_toolpath)
+    print(f"{len(toolpath.operations)} operations, {len(toolpath)} moves, "
+          f"{toolpath.nbytes / len(toolpath):.0f} bytes per move")
+
+    # Compare the lead-in moves of layered and helical passes.
+    for strategy in ("layered", "helical"):
+        toolpath = build_toolpath(example_patterns, dict(example_toolpath, pass_strategy=strategy))
+        print(f"{strategy.capitalize()} passes: {len(toolpath)} moves, "
+              f"{np.count_nonzero(toolpath.kind == MOVE_RETRACT)} retracts")